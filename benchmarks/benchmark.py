@@ -0,0 +1,248 @@
+"""
+benchmark.py
+
+Benchmark suite for the accounting and forecasting hot paths, run on synthetic data (see `pf.synthetic`).
+
+Each benchmark runs in a fresh process so the peak memory of one does not leak into the next. Results are stored as `json` in
+`benchmarks/results/` so runs (e.g. before and after an upgrade) can be compared.
+
+Usage:
+```
+python benchmarks/benchmark.py --sizes 1000 10000 100000
+python benchmarks/benchmark.py --only calc_cashflow --sizes 1000000 10000000
+python benchmarks/benchmark.py --compare benchmarks/results/before.json benchmarks/results/after.json
+```
+
+project    : pf
+version    : 0.0.0
+status     : development
+modifydate :
+createdate :
+website    : https://github.com/tmthydvnprt/pf
+author     : tmthydvnprt
+email      : tim@tmthydvnprt.com
+maintainer : tmthydvnprt
+license    : MIT
+copyright  : Copyright 2016, tmthydvnprt
+credits    :
+
+"""
+from __future__ import division, print_function
+
+import os
+import sys
+import gc
+import json
+import time
+import platform
+import argparse
+import datetime
+import resource
+import traceback
+import subprocess
+import multiprocessing
+
+try:
+    from Queue import Empty
+except ImportError:
+    from queue import Empty
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, REPO_DIR)
+
+# pylint: disable=wrong-import-position
+import numpy as np
+import pandas as pd
+
+import pf.io
+import pf.util
+import pf.synthetic
+import pf.accounting
+import pf.forecasting
+
+################################################################################################################################
+# Benchmark Constants
+################################################################################################################################
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_SIZES = [1000, 10000, 100000]
+POLL_SECONDS = 1.0
+SEED = 0
+
+################################################################################################################################
+# Benchmark Setups
+################################################################################################################################
+# Each setup takes the number of transactions and returns the (function, args, kwds, rows) of the benchmark. Functions that do
+# not work on transactions scale their own input from the size.
+
+def date_span(size):
+    """Date span of `size` transactions, one year per 10,000 transactions (1 to 30 years)"""
+    years = max(1, min(30, size // 10000))
+    end = pd.Timestamp('2016-12-31')
+    return (end - pd.DateOffset(years=years) + pd.DateOffset(days=1), end)
+
+def setup_calc_income(size):
+    """calc_income on `size` transactions and matching biweekly paychecks"""
+    start, end = date_span(size)
+    categories = pf.synthetic.generate_categories()
+    transactions = pf.synthetic.generate_transactions(size, start, end, seed=SEED)
+    paychecks = pf.io.paycheck_parser(pf.synthetic.generate_paycheck_texts(start, end, seed=SEED))
+    kwds = {'category_dict': categories['income'], 'tax_type': categories['tax_type']}
+    return (pf.accounting.calc_income, (paychecks, transactions), kwds, size)
+
+def setup_calc_cashflow(size):
+    """calc_cashflow on `size` transactions"""
+    start, end = date_span(size)
+    categories = pf.synthetic.generate_categories()
+    transactions = pf.synthetic.generate_transactions(size, start, end, seed=SEED)
+    kwds = {'category_dict': categories['cashflow'], 'tax_type': categories['tax_type']}
+    return (pf.accounting.calc_cashflow, (transactions,), kwds, size)
+
+def setup_best_fit_distribution(size):
+    """best_fit_distribution on `size / 100` monthly log changes (fitting ~90 distributions is slow)"""
+    rows = max(24, size // 100)
+    data = pd.Series(np.random.RandomState(SEED).standard_t(5, rows) * 0.02)
+    return (pf.util.best_fit_distribution, (data,), {}, rows)
+
+def setup_monte_carlo_forecast(size):
+    """monte_carlo_forecast of all synthetic accounts for 1 year with `size / 10` runs"""
+    accounts = pf.synthetic.generate_accounts(36, seed=SEED)[0]
+    models = {account: ('norm', (0.0, 0.01)) for account in accounts}
+    runs = max(10, size // 10)
+    kwds = {'number_of_runs': runs, 'years': 1}
+    return (pf.forecasting.monte_carlo_forecast, (accounts, models, accounts.index[-1]), kwds, runs)
+
+def setup_paycheck_parser(size):
+    """paycheck_parser (the parsing step of read_in_paychecks) on `size / 100` paycheck texts"""
+    number_of_paychecks = max(26, size // 100)
+    end = pd.Timestamp('2016-12-31')
+    start = end - pd.DateOffset(weeks=2 * number_of_paychecks)
+    texts = pf.synthetic.generate_paycheck_texts(start, end, seed=SEED)
+    return (pf.io.paycheck_parser, (texts,), {}, len(texts))
+
+BENCHMARKS = [
+    ('calc_income', setup_calc_income),
+    ('calc_cashflow', setup_calc_cashflow),
+    ('best_fit_distribution', setup_best_fit_distribution),
+    ('monte_carlo_forecast', setup_monte_carlo_forecast),
+    ('paycheck_parser', setup_paycheck_parser),
+]
+
+################################################################################################################################
+# Benchmark Running
+################################################################################################################################
+def run_benchmark(setup, size, repeat, queue):
+    """
+    Run a single benchmark, in its own process, and put (best time, peak memory increase, rows, error) on the queue.
+    If setup or the benchmarked function raises, the traceback is put as the error instead.
+    """
+    try:
+        # Setup data and measure the memory already used
+        func, args, kwds, rows = setup(size)
+        gc.collect()
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        # Best of repeated runs
+        times = []
+        for _ in range(repeat):
+            start = time.time()
+            func(*args, **kwds)
+            times.append(time.time() - start)
+
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+        peak_mb = peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+        queue.put((min(times), peak_mb, rows, None))
+    except Exception: # pylint: disable=broad-except
+        queue.put((None, None, None, traceback.format_exc()))
+
+def wait_benchmark(process, queue):
+    """Wait for a benchmark process result, returns an error if the process died (e.g. killed for memory) without one"""
+    while True:
+        try:
+            return queue.get(timeout=POLL_SECONDS)
+        except Empty:
+            if process.exitcode is not None:
+                return None, None, None, 'process exited with code {} without a result'.format(process.exitcode)
+
+def run_benchmarks(names=None, sizes=None, repeat=3):
+    """Run benchmarks at each size, returns a list of result dictionaries (failed runs have an `error` and no timing)"""
+
+    results = []
+    for name, setup in BENCHMARKS:
+        if names and name not in names:
+            continue
+        for size in sizes:
+            queue = multiprocessing.Queue()
+            process = multiprocessing.Process(target=run_benchmark, args=(setup, size, repeat, queue))
+            process.start()
+            best_time, peak_mb, rows, error = wait_benchmark(process, queue)
+            process.join()
+            result = {'name': name, 'size': size, 'rows': rows, 'time': best_time, 'peak_mb': peak_mb}
+            if error:
+                result['error'] = error
+                print('{:<24} {:>10,} FAILED\n{}'.format(name, size, error))
+            else:
+                print('{:<24} {:>10,} {:>10,} rows {:>10.4f} s {:>10.1f} MB'.format(name, size, rows, best_time, peak_mb))
+            results.append(result)
+            sys.stdout.flush()
+
+    return results
+
+def git_commit():
+    """Current git commit of the repository, if any"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+def save_results(results, output_dir=RESULTS_DIR):
+    """Save benchmark results and environment info as `json`, returns the file path"""
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    now = datetime.datetime.now()
+    filepath = os.path.join(output_dir, now.strftime('%Y%m%d-%H%M%S') + '.json')
+    with open(filepath, 'w') as f:
+        json.dump({
+            'date': now.isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'results': results
+        }, f, indent=4, sort_keys=True)
+    return filepath
+
+def compare_results(before_file, after_file):
+    """Print the time and peak memory ratio (after / before) of each benchmark that succeeded in both results files"""
+    with open(before_file, 'r') as f:
+        before = {(r['name'], r['size']): r for r in json.load(f)['results'] if not r.get('error')}
+    with open(after_file, 'r') as f:
+        after = {(r['name'], r['size']): r for r in json.load(f)['results'] if not r.get('error')}
+
+    print('{:<24} {:>10} {:>12} {:>12} {:>8} {:>8}'.format('benchmark', 'size', 'before [s]', 'after [s]', 'time', 'memory'))
+    for key in sorted(set(before) & set(after)):
+        b, a = before[key], after[key]
+        memory_ratio = a['peak_mb'] / b['peak_mb'] if b['peak_mb'] else np.nan
+        print('{:<24} {:>10,} {:>12.4f} {:>12.4f} {:>7.2f}x {:>7.2f}x'.format(
+            key[0], key[1], b['time'], a['time'], a['time'] / b['time'], memory_ratio
+        ))
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Benchmark pf accounting and forecasting hot paths.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='number of transactions')
+    parser.add_argument('--only', nargs='+', default=None, help='benchmark names to run')
+    parser.add_argument('--repeat', type=int, default=3, help='repeats per benchmark (best is kept)')
+    parser.add_argument('--output', default=RESULTS_DIR, help='results directory')
+    parser.add_argument('--compare', nargs=2, default=None, metavar=('BEFORE', 'AFTER'), help='compare two results files')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+    else:
+        results = run_benchmarks(names=args.only, sizes=args.sizes, repeat=args.repeat)
+        print('Saved results to {}'.format(save_results(results, args.output)))
+
+if __name__ == '__main__':
+    main()
@@ -20,7 +20,10 @@ credits    :
 
 from __future__ import division
 
-__all__ = ['constants', 'io', 'util', 'accounting', 'forecasting', 'plot']
+__all__ = [
+    'constants', 'io', 'util', 'accounting', 'forecasting', 'plot', 'report', 'group', 'matching', 'comparison', 'synthetic',
+    'instrument'
+]
 __version__ = '0.0.0'
 __date__ = '2016-03-06 09:30:00 -0700'
 __author__ = 'tmthydvnprt'
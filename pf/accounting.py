@@ -18,11 +18,84 @@ credits    :
 
 """
 import datetime
+import collections
+from collections import OrderedDict
+
 import numpy as np
 import pandas as pd
+from scipy import sparse
 
-from pf.constants import DAYS_IN_YEAR
-from pf.util import get_age
+from pf.constants import DAYS_IN_YEAR, BALANCE_MAPPING_CACHE_SIZE, METRIC_AVERAGED, METRIC_WINDOWS
+from pf.util import get_ages, year_fractions, lru_get, StatsAccumulator
+
+################################################################################################################################
+# Category Mappings
+################################################################################################################################
+class BalanceMapping(object):
+    """
+    Balance `category_dict` (see `calc_balance()`) compiled for a set of account `columns` into a sparse (accounts x categories)
+    0/1 matrix, so balances of every date and category are one matrix multiply. Level 0 selectors (e.g. `Cash`) map every
+    account of that type.
+    """
+
+    def __init__(self, columns=None, category_dict=None):
+        """Compile the mapping"""
+        self.columns = columns
+        self.categories = pd.MultiIndex.from_tuples(sorted(
+            (k0, k1, k2)
+            for k0, v0 in category_dict.iteritems()
+            for k1, v1 in v0.iteritems()
+            for k2 in v1
+        ))
+
+        # Mark the accounts of each category
+        positions = {}
+        for i, column in enumerate(columns):
+            positions.setdefault(column, []).append(i)
+            if isinstance(column, tuple):
+                positions.setdefault(column[0], []).append(i)
+        # Selectors without accounts are likely typos, fail like selecting them from the accounts would
+        missing = sorted({
+            selector
+            for k0, k1, k2 in self.categories
+            for selector in category_dict[k0][k1][k2]
+            if selector not in positions
+        })
+        if missing:
+            raise KeyError('Category selectors match no accounts: {}'.format(missing))
+
+        rows, cols = [], []
+        for j, (k0, k1, k2) in enumerate(self.categories):
+            accounts = sorted({i for selector in category_dict[k0][k1][k2] for i in positions[selector]})
+            rows.extend(accounts)
+            cols.extend([j] * len(accounts))
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, cols)),
+            shape=(len(columns), len(self.categories))
+        )
+
+BALANCE_MAPPINGS = OrderedDict()
+
+def freeze_category_dict(category_dict=None):
+    """Hashable copy of a 3 level `category_dict`"""
+    return tuple(sorted(
+        (k0, k1, k2, tuple(v2))
+        for k0, v0 in category_dict.iteritems()
+        for k1, v1 in v0.iteritems()
+        for k2, v2 in v1.iteritems()
+    ))
+
+def balance_mapping(columns=None, category_dict=None):
+    """
+    Get a memoized BalanceMapping for account `columns` and `category_dict`, shared by every call and member with the same
+    chart of accounts. The least recently used mappings are evicted once there are more than BALANCE_MAPPING_CACHE_SIZE.
+    """
+    return lru_get(
+        BALANCE_MAPPINGS,
+        (tuple(columns), freeze_category_dict(category_dict)),
+        lambda: BalanceMapping(columns, category_dict),
+        BALANCE_MAPPING_CACHE_SIZE
+    )
 
 ################################################################################################################################
 # Financial Statements
@@ -69,18 +142,15 @@ def calc_balance(accounts=None, category_dict=None):
     }
     """
 
-    # Aggregate accounts based on category definition, via 3 level dictionary comprehension
-    balance_dict = {
-        (k0, k1, k2): accounts[v2].sum(axis=1) if v2 else pd.Series(0, index=accounts.index)
-        for k0, v0 in category_dict.iteritems()
-        for k1, v1 in v0.iteritems()
-        for k2, v2 in v1.iteritems()
-    }
-
-    # Convert to DataFrame
-    balance = pd.DataFrame(balance_dict)
+    # Aggregate accounts based on category definition, via one (dates x accounts) . (accounts x categories) matrix multiply
+    mapping = balance_mapping(accounts.columns, category_dict)
+    balance = pd.DataFrame(
+        mapping.matrix.T.dot(accounts.fillna(0.0).values.T).T,
+        index=accounts.index,
+        columns=mapping.categories.copy()
+    )
 
-    return balance.fillna(0.0)
+    return balance
 
 def balance_sheet(balance=None, period=datetime.datetime.now().year):
     """
@@ -523,21 +593,13 @@ def calculate_net_worth(accounts=None):
 
     return net_worth
 
-def calculate_stats(net_worth=None):
-    """Calculate the statistics (Current, Max, Min, Mean, Median, Std. Dev.) of a `net_worth` DataFrame"""
-
-    # Remove Infs and NaNs
-    net_worth = net_worth.replace([-np.Inf, np.Inf, np.nan], 0.0)
-
-    # Calculate Statistics
-    stats = pd.DataFrame({'Current': net_worth.iloc[-1]})
-    stats['Max'] = net_worth.max(skipna=True)
-    stats['Min'] = net_worth.min(skipna=True)
-    stats['Mean'] = net_worth.mean(skipna=True)
-    stats['Median'] = net_worth.median(skipna=True)
-    stats['Std Dev'] = net_worth.std(skipna=True)
-
-    return stats
+def calculate_stats(net_worth=None, quantiles=None):
+    """
+    Calculate the statistics (Current, Max, Min, Mean, Median, Std. Dev.) of a `net_worth` DataFrame in a single pass, with
+    additional columns for `quantiles` (0 to 1) if given. Infs and NaNs count as 0.0. See `pf.util.StatsAccumulator` for
+    statistics of data arriving in chunks or pooled across members.
+    """
+    return StatsAccumulator().update(net_worth).stats(quantiles)
 
 def calculate_growth(net_worth=None, offsets=None):
     """
@@ -645,30 +707,34 @@ def summarize_accounts(accounts=None):
 
     return account_summary
 
-def get_milestones(networth=None, milestones=None):
+def get_milestones(networth=None, milestones=None, asof=None):
     """
     Search networth for milestones.
 
     The default milestones are 1e4, 2.5e4, 5e4, 7.5e4, 1e5, 1.5e5, 2e5, 2.5e5, 5e5, 7.5e5, 1e6, 1.5e6 and 2e6
+
+    `Years` are measured from `asof` (now by default).
     """
     milestones = milestones if milestones else np.array([
         1e4, 2.5e4, 5e4, 7.5e4, 1e5, 1.5e5, 2e5, 2.5e5, 5e5, 7.5e5, 1e6, 1.5e6, 2e6
     ])
+    asof = pd.Timestamp(asof if asof is not None else datetime.datetime.now())
+
+    # First date each milestone is reached, all milestones at once
+    net = networth['Net'].values
+    reached_all = net[np.newaxis, :] >= np.asarray(milestones)[:, np.newaxis]
+    reached = reached_all.any(axis=1)
+    first = reached_all.argmax(axis=1)
+    dates = networth.index[first]
+    ages = get_ages(dates)
+    years = year_fractions(dates, asof)
+
     milestone_data = []
-    for milestone in milestones:
-        gt_milestone = networth['Net'] >= milestone
-        if gt_milestone.any():
-            milestone_date = gt_milestone[gt_milestone].index[0]
-            milestone_age = get_age(milestone_date)
-            milestone_years = (milestone_date - datetime.datetime.today()).days / DAYS_IN_YEAR
-            milestone_actual = networth['Net'].loc[milestone_date]
+    for i, milestone in enumerate(milestones):
+        if reached[i]:
+            milestone_data.append((dates[i], milestone, net[first[i]], ages[i], years[i]))
         else:
-            milestone_date = None
-            milestone_age = None
-            milestone_years = None
-            milestone_actual = -(milestone - networth['Net'].iloc[-1])
-
-        milestone_data.append((milestone_date, milestone, milestone_actual, milestone_age, milestone_years))
+            milestone_data.append((None, milestone, -(milestone - net[-1]), None, None))
 
     return pd.DataFrame(milestone_data, columns=['Date', 'Milestone', 'Actual', 'Age', 'Years'])
 
@@ -676,11 +742,18 @@ def summary_statement(networth=None, income=None, cashflow=None, limits=None, sa
     """
     Combine accounts, expenses, income, debt, etc. into one high level DataFrame
     """
+    # Resample daily income and cashflow once
+    monthly_income = income.resample('M').sum()
+    monthly_cashflow = cashflow.resample('M').sum()
+    outflow = monthly_cashflow['Outflow'].sum(axis=1)
+    purchased_investments = monthly_cashflow[('Outflow', 'Non-Operating', 'Purchased Investments')]
+    loan_payments = monthly_cashflow[('Outflow', 'Operating', 'Loan Payments')]
+
     # Estimate monthly sales tax spending
-    sales_tax_spending = cashflow[[
+    sales_tax_spending = monthly_cashflow[[
         ('Outflow', 'Non-Operating', 'Discretionary'),
         ('Outflow', 'Operating', 'Transportation')
-    ]].resample('M').sum().sum(axis=1)
+    ]].sum(axis=1)
     # Get tax rate average
     avg_sales_tax_percent = salestax.sum(1) / (salestax > 0).sum(1)
     # Calculate dollar amount of sales tax paid
@@ -688,25 +761,18 @@ def summary_statement(networth=None, income=None, cashflow=None, limits=None, sa
 
     summary = pd.concat([
         networth[['Assets', 'Debts', 'Net']],
-        12.0 * pd.DataFrame(income['Revenue'].resample('M').sum().sum(axis=1), columns=['Total Income']),
-        12.0 * pd.DataFrame(cashflow['Inflow'].resample('M').sum().sum(axis=1), columns=['Realized Income']),
-        12.0 * pd.DataFrame(
-            cashflow['Outflow'].resample('M').sum().sum(axis=1) \
-            - cashflow[('Outflow', 'Non-Operating', 'Purchased Investments')].resample('M').sum()
-            , columns=['Expense + Loans']),
-        12.0 * pd.DataFrame(
-            cashflow['Outflow'].resample('M').sum().sum(axis=1) \
-            - cashflow[('Outflow', 'Operating', 'Loan Payments')].resample('M').sum() \
-            - cashflow[('Outflow', 'Non-Operating', 'Purchased Investments')].resample('M').sum()
-            , columns=['Expense']),
-        12.0 * pd.DataFrame(income['Taxes'].resample('M').sum().sum(axis=1), columns=['Taxes']),
+        12.0 * pd.DataFrame(monthly_income['Revenue'].sum(axis=1), columns=['Total Income']),
+        12.0 * pd.DataFrame(monthly_cashflow['Inflow'].sum(axis=1), columns=['Realized Income']),
+        12.0 * pd.DataFrame(outflow - purchased_investments, columns=['Expense + Loans']),
+        12.0 * pd.DataFrame(outflow - loan_payments - purchased_investments, columns=['Expense']),
+        12.0 * pd.DataFrame(monthly_income['Taxes'].sum(axis=1), columns=['Taxes']),
         pd.DataFrame(limits.sum(axis=1), columns=['Credit Line']),
         12.0 * pd.DataFrame(sales_tax_pay, columns=['Sales Tax'])
     ], axis=1).dropna()
 
     return summary
 
-def calc_metrics(summary=None, swr=0.04):
+def calc_metrics(summary=None, swr=0.04, windows=None):
     """
     Calculate various metrics for personal finance.
 
@@ -745,10 +811,107 @@ def calc_metrics(summary=None, swr=0.04):
 
     The default SWR (Safe Withdrawl Rate) is 0.04.
 
+    Income, expense and tax columns are averaged over the lifetime (expanding mean) by default. If a list of `windows` is given
+    (e.g. `METRIC_WINDOWS`: trailing 3, 12 and 36 months and lifetime) the metrics of every window are calculated in one pass
+    and returned with (Window, Metric) columns. The `summary` is not modified. See `RunningMetrics` to update metrics a month
+    at a time.
+
+    """
+    # Create means from month to month yearly estimates over each window
+    averaged = window_means(summary, windows if windows else [('Life', None)])
+    metrics = summary_ratios(averaged, swr=swr)
+
+    if not windows:
+        return metrics.loc['Life']
+
+    names = [name for name, _ in windows]
+    return pd.concat([metrics.loc[name] for name in names], axis=1, keys=names)
+
+def window_means(summary=None, windows=None):
+    """
+    Average the `METRIC_AVERAGED` columns of `summary` over each of `windows` (a list of (name, months) tuples, None months is
+    the expanding mean), returns a copy of the summary for every window stacked with a (`Window`, `Date`) index.
+
+    Every window comes from one cumulative sum, a trailing mean is the difference of cumulative sums `months` apart divided by
+    the number of valid months (so the first months use all the months so far). Missing values are skipped.
+    """
+
+    values = summary[METRIC_AVERAGED].values.astype(np.float64)
+    valid = ~np.isnan(values)
+    zeros = np.zeros((1, values.shape[1]))
+    sums = np.vstack([zeros, np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    counts = np.vstack([zeros, np.cumsum(valid, axis=0)])
+
+    frames = []
+    end = np.arange(1, len(values) + 1)
+    for _, months in windows:
+        start = np.maximum(end - months, 0) if months else np.zeros(len(values), dtype=int)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = (sums[end] - sums[start]) / (counts[end] - counts[start])
+        frame = summary.copy()
+        frame[METRIC_AVERAGED] = means
+        frames.append(frame)
+
+    return pd.concat(frames, keys=[name for name, _ in windows], names=['Window', 'Date'])
+
+class RunningMetrics(object):
+    """
+    Running sums of the averaged summary columns over several windows (see `calc_metrics()`), so appending a month updates every
+    window's metrics in constant time instead of recalculating the whole history.
+
+    Example:
+    ```
+    running = RunningMetrics(windows=METRIC_WINDOWS)
+    running.update(summary)
+    ...
+    running.update(new_month_summary)
+    latest_metrics = running.metrics()
+    ```
+    """
+
+    def __init__(self, windows=None, swr=0.04):
+        """Create empty running sums for each window"""
+        self.windows = windows if windows else METRIC_WINDOWS
+        self.swr = swr
+        self.sums = np.zeros((len(self.windows), len(METRIC_AVERAGED)))
+        self.counts = np.zeros((len(self.windows), len(METRIC_AVERAGED)))
+        self.history = collections.deque(maxlen=max([months for _, months in self.windows if months] + [1]))
+        self.latest = None
+
+    def update(self, summary=None):
+        """Append the months of a summary DataFrame (see `summary_statement()`), in chronological order"""
+        for values in summary[METRIC_AVERAGED].values.astype(np.float64):
+            valid = ~np.isnan(values)
+            values = np.where(valid, values, 0.0)
+
+            # Add the new month to every window and remove the month leaving each trailing window
+            self.sums += values
+            self.counts += valid
+            for i, (_, months) in enumerate(self.windows):
+                if months and len(self.history) >= months:
+                    old_values, old_valid = self.history[-months]
+                    self.sums[i] -= old_values
+                    self.counts[i] -= old_valid
+            self.history.append((values, valid))
+
+        self.latest = summary.iloc[[-1]]
+        return self
+
+    def metrics(self):
+        """Metrics of the latest month for every window, returns a Series with a (Window, Metric) index"""
+        names = [name for name, _ in self.windows]
+        averaged = pd.concat([self.latest] * len(self.windows), keys=names, names=['Window', 'Date'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            averaged[METRIC_AVERAGED] = self.sums / self.counts
+        metrics = summary_ratios(averaged, swr=self.swr)
+        metrics.index = metrics.index.droplevel('Date')
+        return metrics.stack().reindex(names, level=0)
+
+def summary_ratios(summary=None, swr=0.04):
+    """
+    Calculate the metric ratios of `calc_metrics()` from a summary as is (without averaging). Every metric is an element-wise
+    ratio of summary columns, so any row index works (e.g. stacked summaries of many members).
     """
-    # Create mean from month to month yearly estimates
-    cols = ['Total Income', 'Realized Income', 'Expense + Loans', 'Expense', 'Taxes', 'Sales Tax']
-    summary[cols] = summary[cols].expanding().mean()
 
     # Calculate metrics
     metrics = pd.DataFrame({
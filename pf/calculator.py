@@ -4,8 +4,13 @@ calculator.py
 General functions that would be in a finacial calculator.
 """
 
+from collections import OrderedDict
+
 import numpy as np
 
+from pf.constants import DISCOUNT_TABLE_CACHE_SIZE
+from pf.util import lru_get
+
 # Typical Financial Calculator Functions
 # ------------------------------------------------------------------------------------------------------------------------------
 def future_value(present_value=100.0, rate=0.07, num_period=1.0, frequency=1.0):
@@ -116,3 +121,71 @@ def annuity(p=100.0, rate=0.07, num_period=10.0, frequency=1.0):
     formula.
     """
     return p * ((np.power(1.0 + rate / frequency, num_period * frequency) - 1.0) / rate / frequency)
+
+# Discount Factor Tables
+# ------------------------------------------------------------------------------------------------------------------------------
+class DiscountTable(object):
+    """
+    Precomputed discount and compounding factors for a rate curve compounded every frequency, so any cashflow series can be
+    discounted or compounded with a single dot product.
+
+    rates is a single annual rate or a curve of annual rates, one per cashflow period. Cashflows are assumed to happen at the
+    end of each of num_periods periods, with periods_per_year periods in a year (e.g. 12.0 for monthly cashflows).
+    """
+
+    def __init__(self, rates=0.07, num_periods=12, frequency=1.0, periods_per_year=12.0):
+        """Build the factor tables"""
+        self.rates = np.ones(num_periods) * rates
+        self.frequency = frequency
+        self.periods_per_year = periods_per_year
+        # Growth of each period, same as future_value() of 1.0 over a single period
+        period_growth = np.power(1.0 + self.rates / frequency, frequency / periods_per_year)
+        self.compound_factors = np.cumprod(period_growth)
+        self.discount_factors = 1.0 / self.compound_factors
+        self.effective_rates = effective_return(rate=self.rates, frequency=frequency)
+
+    def __len__(self):
+        """Number of periods in table"""
+        return len(self.discount_factors)
+
+    def present_value(self, cashflows):
+        """
+        Calculate the present value of cashflows. A 2D array of cashflows (scenarios x periods) returns the present value of
+        every scenario in one matrix multiply.
+        """
+        cashflows = np.asarray(cashflows)
+        return cashflows.dot(self.discount_factors[:cashflows.shape[-1]])
+
+    def future_value(self, cashflows):
+        """
+        Calculate the future value of cashflows at the end of the last cashflow period. A 2D array of cashflows
+        (scenarios x periods) returns the future value of every scenario in one matrix multiply.
+        """
+        cashflows = np.asarray(cashflows)
+        num_periods = cashflows.shape[-1]
+        return self.compound_factors[num_periods - 1] * cashflows.dot(self.discount_factors[:num_periods])
+
+    def discount(self, cashflows):
+        """Discount each cashflow to its present value"""
+        cashflows = np.asarray(cashflows)
+        return cashflows * self.discount_factors[:cashflows.shape[-1]]
+
+    def compound(self, cashflows):
+        """Compound each cashflow to the end of the last cashflow period"""
+        cashflows = np.asarray(cashflows)
+        num_periods = cashflows.shape[-1]
+        return cashflows * (self.compound_factors[num_periods - 1] * self.discount_factors[:num_periods])
+
+DISCOUNT_TABLES = OrderedDict()
+
+def discount_table(rates=0.07, num_periods=12, frequency=1.0, periods_per_year=12.0):
+    """
+    Get a memoized DiscountTable for a rate curve and compounding frequency. The least recently used tables are evicted once
+    there are more than DISCOUNT_TABLE_CACHE_SIZE tables.
+    """
+    return lru_get(
+        DISCOUNT_TABLES,
+        (tuple(np.ones(num_periods) * rates), num_periods, frequency, periods_per_year),
+        lambda: DiscountTable(rates=rates, num_periods=num_periods, frequency=frequency, periods_per_year=periods_per_year),
+        DISCOUNT_TABLE_CACHE_SIZE
+    )
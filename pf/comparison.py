@@ -0,0 +1,128 @@
+"""
+comparison.py
+
+Compare personal finance data against national (population) averages from FRED data.
+
+project    : pf
+version    : 0.0.0
+status     : development
+modifydate :
+createdate :
+website    : https://github.com/tmthydvnprt/pf
+author     : tmthydvnprt
+email      : tim@tmthydvnprt.com
+maintainer : tmthydvnprt
+license    : MIT
+copyright  : Copyright 2016, tmthydvnprt
+credits    :
+
+"""
+from __future__ import division
+
+import os
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import scipy.stats as st
+
+from pf.io import read_in_fred
+from pf.util import lru_get
+from pf.constants import REFERENCE_CACHE_SIZE
+
+################################################################################################################################
+# Reference Data
+################################################################################################################################
+# Aligned reference frames, least recently used first
+REFERENCE_CACHE = OrderedDict()
+
+def fred_selector(column):
+    """FRED column of a category map value, a name selects the first instance (see `pf.io.fred_columns()`)"""
+    return column if isinstance(column, tuple) else (column, 0)
+
+def reference_frame(filepath='', category_map=None, annualized=True):
+    """
+    Build the monthly population average of each user category from the FRED data file, returns a DataFrame with a monthly
+    PeriodIndex and the user categories as columns.
+
+    `category_map` is a dictionary of user cashflow columns and the list of FRED columns summed into each. FRED values are
+    seasonally adjusted annual rates, so they are divided by 12 when `annualized` is set.
+
+    The aligned frame is cached by file, file modification time and category map, so repeated comparisons reuse it. The least
+    recently used frames are evicted once there are more than REFERENCE_CACHE_SIZE frames.
+    """
+    return lru_get(
+        REFERENCE_CACHE,
+        (
+            filepath,
+            os.path.getmtime(filepath),
+            tuple(sorted((k, tuple(fred_selector(c) for c in v)) for k, v in category_map.items())),
+            annualized
+        ),
+        lambda: build_reference_frame(filepath, category_map, annualized),
+        REFERENCE_CACHE_SIZE
+    )
+
+def build_reference_frame(filepath='', category_map=None, annualized=True):
+    """Build the monthly population average of each user category from the FRED data file, uncached (see `reference_frame()`)"""
+
+    # Read only the needed FRED columns
+    fred_cols = sorted({fred_selector(c) for v in category_map.values() for c in v})
+    fred = read_in_fred(filepath, columns=fred_cols)[fred_cols]
+
+    # Sum FRED columns into categories with one (dates x fred columns) . (fred columns x categories) matrix multiply
+    categories = sorted(category_map.keys())
+    mapping = np.zeros((len(fred_cols), len(categories)))
+    for j, cat in enumerate(categories):
+        for c in category_map[cat]:
+            mapping[fred_cols.index(fred_selector(c)), j] = 1.0
+    reference = pd.DataFrame(
+        fred.values.astype(np.float64).dot(mapping) / (12.0 if annualized else 1.0),
+        index=fred.index.to_period('M'),
+        columns=pd.MultiIndex.from_tuples(categories) if isinstance(categories[0], tuple) else categories
+    )
+
+    return reference
+
+################################################################################################################################
+# Comparison
+################################################################################################################################
+def compare_to_population(cashflow=None, filepath='', category_map=None, sigma=0.5, annualized=True):
+    """
+    Compare monthly outflow of each mapped `cashflow` category (see `pf.accounting.calc_cashflow()`) to the population average,
+    returns a DataFrame with columns for each category under `Spending`, `Average`, `Ratio [%]`, `Difference [$]` and
+    `Percentile [%]`.
+
+    The FRED data only provides averages, so percentiles assume spending in each category is lognormally distributed across
+    the population with the average as its mean and `sigma` as its log standard deviation.
+
+    Example:
+    ```
+    category_map = {
+        ('Outflow', 'Operating', 'Rent'): ['Housing'],
+        ('Outflow', 'Operating', 'Food'): ['Food and beverages purchased for off-premises consumption', 'Food services']
+    }
+    comparison = compare_to_population(cashflow, '/path/to/average_personal_income_and_expense.csv', category_map)
+    ```
+    """
+
+    # Monthly user spending on shared monthly PeriodIndex
+    categories = sorted(category_map.keys())
+    spending = -cashflow.resample('M').sum()[categories]
+    spending.index = spending.index.to_period('M')
+
+    # Population average aligned to user months
+    average = reference_frame(filepath, category_map, annualized).reindex(spending.index)
+
+    # Compare every category in one pass
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mu = np.log(average.values) - 0.5 * sigma ** 2
+        percentile = 100.0 * st.norm.cdf((np.log(spending.values) - mu) / sigma)
+    comparison = pd.concat([
+        spending,
+        average,
+        100.0 * spending / average,
+        spending - average,
+        pd.DataFrame(percentile, index=spending.index, columns=spending.columns)
+    ], axis=1, keys=['Spending', 'Average', 'Ratio [%]', 'Difference [$]', 'Percentile [%]'])
+
+    return comparison
@@ -26,9 +26,91 @@ import re
 # General Constants
 DAYS_IN_YEAR = 365.24
 DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+PROGRESS_INTERVAL = 0.5
+F2AS_CACHE_SIZE = 100000
+
+# Largest amount of cents `pf.util.f2as_array()` formats as exact integers (floats are exact integers up to 2 ** 53)
+F2AS_MAX_CENTS = 2.0 ** 53
+
+# Values kept exactly by each cell of a `pf.util.QuantileSketch` before compressing into `size / 2` centroids
+QUANTILE_SKETCH_SIZE = 10000
+
+# Intervals of `pf.util.InverseCDFTable` (sampled CDF is within 1 / size of the fit distribution), and tables kept in memory
+INVERSE_CDF_TABLE_SIZE = 4096
+INVERSE_CDF_TABLE_CACHE_SIZE = 256
+
+# Cost of a numerically inverted `ppf` (scipy distributions without a closed form) in closed form evaluations, used to choose
+# between inverse CDF tables and exact sampling
+INVERSE_CDF_NUMERICAL_PPF_COST = 1000.0
 
 # Regex Constants
 
 
+# Paycheck Constants
+# Declarative layout of the default pay stub, compiled by `pf.io.PaycheckParser`. Sections start on a line containing their
+# anchor (plain text, not regex):
+#   value  : first word after the anchor, on the same line (and the text before the anchor as `prefix` field if given)
+#   next   : number on the next line, scaled by the text before the anchor (e.g. `Hourly Base Rate:` x 80 hours)
+#   row    : numbers on the next line (after its label) stored in `fields`
+#   tables : side by side tables whose columns are found from the header line, read until a line containing `end`. Each row
+#            stores the table's `column` under the row label, the `end` row is stored as `Total <total>`. A header without
+#            the `column` text uses the header word at position `index` instead
+PAYCHECK_SPEC = [
+    {'kind': 'value', 'anchor': 'Check Date:', 'field': 'Date', 'type': 'date', 'prefix': 'Employer'},
+    {'kind': 'next', 'anchor': 'Base Rate:', 'field': 'Base Rate', 'scale': {'Hourly': 80.0}},
+    {
+        'kind': 'row',
+        'anchor': 'Total Gross',
+        'fields': ['Total Gross', 'Fed Taxable Gross', 'OASDI Gross', 'MEDI Gross', 'Net Pay']
+    },
+    {
+        'kind': 'tables',
+        'end': 'Total:',
+        'tables': [
+            {'anchor': 'Earnings', 'column': 'Current', 'index': 2, 'total': 'Pay'},
+            {'anchor': 'Taxes', 'column': 'Current', 'index': 1, 'total': 'Tax'}
+        ]
+    },
+    {
+        'kind': 'tables',
+        'end': 'Total:',
+        'tables': [
+            {'anchor': 'Description', 'column': 'Current', 'index': 1, 'total': 'Before Tax'},
+            {'anchor': 'Description', 'column': 'Current', 'index': 1, 'total': 'After Tax'},
+            {'anchor': 'Description', 'column': 'Current', 'index': 1, 'total': 'Other Tax'}
+        ]
+    }
+]
+
+# Pay stub PDF pages extracted per process, larger PDFs are split across processes. Files up to PDF_POOL_MIN_BYTES are always
+# extracted in one process without counting their pages first
+PDF_PAGES_PER_PROCESS = 16
+PDF_POOL_MIN_BYTES = 1000000
+
+# Accounting Constants
+BALANCE_MAPPING_CACHE_SIZE = 64
+
+# Summary columns averaged by `pf.accounting.calc_metrics()` and its windows: (name, months), None months is expanding
+METRIC_AVERAGED = ['Total Income', 'Realized Income', 'Expense + Loans', 'Expense', 'Taxes', 'Sales Tax']
+METRIC_WINDOWS = [('3 Mo', 3), ('1 Yr', 12), ('3 Yr', 36), ('Life', None)]
+
+# Calculator Constants
+DISCOUNT_TABLE_CACHE_SIZE = 64
+
+# Comparison Constants
+REFERENCE_CACHE_SIZE = 16
+
+
 # Forcasting Constants
 ARIMA_ORDERS = [(3, 2, 1), (2, 2, 1), (2, 1, 1), (1, 1, 1), (1, 1, 0), (1, 0, 0)]
+
+# Smallest eigenvalue kept when repairing an estimated correlation matrix, so its Cholesky factor exists
+MIN_CORRELATION_EIGENVALUE = 1e-8
+
+# Consecutive historical months resampled together by `pf.forecasting.bootstrap_forecast()`
+BOOTSTRAP_BLOCK_SIZE = 12
+
+# Monte Carlo runs simulated at once, and values kept exactly by each (month, account) quantile sketch of a summary
+MONTE_CARLO_CHUNK_SIZE = 500
+MONTE_CARLO_SKETCH_SIZE = 200
+FAN_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
@@ -21,13 +21,20 @@ credits    :
 
 """
 
+from __future__ import division
+
+import os
+import json
+import functools
+import multiprocessing
 import numpy as np
 import pandas as pd
 import scipy.stats as st
 from statsmodels.tsa.arima_model import ARIMA
 
 import pf.util
-from pf.constants import ARIMA_ORDERS
+from pf.constants import ARIMA_ORDERS, MIN_CORRELATION_EIGENVALUE, BOOTSTRAP_BLOCK_SIZE
+from pf.constants import MONTE_CARLO_CHUNK_SIZE, MONTE_CARLO_SKETCH_SIZE, FAN_QUANTILES
 
 
 ################################################################################################################################
@@ -209,71 +216,490 @@ def arima_forecast(account_models, start, **kwds):
 
     return accounts_forecast
 
+def account_changes(accounts):
+    """Monthly log change of each account modeled by `dist_fit_model()`, Infs and NaNs (and -100% changes) are NaN"""
+    return np.log(accounts).pct_change().replace([-1.0, -np.inf, np.inf], np.nan)
+
+def log_returns(accounts):
+    """Monthly log return (difference of log balances) of each account, Infs and NaNs are NaN"""
+    return np.log(accounts).diff().replace([-np.inf, np.inf], np.nan)
+
 def dist_fit_model(accounts):
     """Build models for each account based on log change"""
 
+    # Compute monthly change, ignoring Infs and NaNs
+    changes = account_changes(accounts)
+
     # Model each account
     account_models = {}
     for account_type, account in accounts:
-
-        # Compute monthly change, ignoring Infs and NaNs
-        account_pct_change = np.log(accounts[(account_type, account)]) \
-            .pct_change() \
-            .replace([-1.0, -np.inf, np.inf], np.nan) \
-            .dropna()
         # Generate model
-        model, params = pf.util.best_fit_distribution(account_pct_change)
+        model, params = pf.util.best_fit_distribution(changes[(account_type, account)].dropna())
         account_models[(account_type, account)] = (model, params)
 
     return account_models
 
-def monte_carlo_forecast(accounts, account_models, start, number_of_runs=1000, **kwds):
-    """Forecast accounts with Monte Carlo method from fit distributions"""
+################################################################################################################################
+# Monte Carlo Runs
+################################################################################################################################
+def initial_values(accounts, keys):
+    """Last known value of each account in `keys`, Infs and NaNs start at 1.0"""
+    values = accounts[keys].iloc[-1].values.astype(np.float64)
+    values[~np.isfinite(values)] = 1.0
+    return values
+
+def compound_changes(changes, init_values):
+    """
+    Turn (runs x months x accounts) monthly log `changes` into account values in place, growing from `init_values`. Unrealistic
+    changes larger than +/-50% in one month are clipped.
+    """
+    np.clip(changes, -0.5, 0.5, out=changes)
+    np.exp(changes, out=changes)
+    changes[:, 0, :] *= init_values
+    np.cumprod(changes, axis=1, out=changes)
+    return changes
+
+class ForecastSummary(object):
+    """
+    Streaming summary of Monte Carlo runs: the mean, a `pf.util.QuantileSketch` and the number of runs at or above each of the
+    `thresholds` for every (month, account), plus the `Total` of all accounts. Memory does not depend on the number of runs.
+
+    Runs are added in chunks with `update()` and summaries of separate runs are combined with `merge()`. Quantiles are exact up
+    to `size` runs, after that their rank error is about `pi / size` at the median and less toward the tails.
+
+    Example:
+    ```
+    summary = monte_carlo_forecast(accounts, models, start, number_of_runs=100000, output='summary', thresholds=[1e6], years=30)
+    bands = summary.bands()
+    probability = summary.probability(1e6)['Total']
+    ```
+    """
+
+    def __init__(self, dates, keys, thresholds=None, size=MONTE_CARLO_SKETCH_SIZE):
+        """Empty summary of `keys` accounts over `dates`"""
+        self.dates = dates
+        self.columns = list(keys) + [('Total', 'Total') if isinstance(keys[0], tuple) else 'Total']
+        self.thresholds = sorted(thresholds) if thresholds else []
+        self.runs = 0
+        shape = (len(dates), len(self.columns))
+        self.sum = np.zeros(shape)
+        self.exceeded = np.zeros((len(self.thresholds),) + shape, dtype=np.int64)
+        self.sketch = pf.util.QuantileSketch(shape, size)
+
+    def update(self, paths):
+        """Add (runs x months x accounts) `paths`, returns the summary"""
+        paths = np.concatenate([paths, paths.sum(axis=2)[:, :, None]], axis=2)
+        self.runs += len(paths)
+        self.sum += paths.sum(axis=0)
+        for i, threshold in enumerate(self.thresholds):
+            self.exceeded[i] += (paths >= threshold).sum(axis=0)
+        self.sketch.update(paths)
+        return self
+
+    def merge(self, other):
+        """Merge the runs of `other` summary of the same dates, accounts and thresholds, returns the summary"""
+        self.runs += other.runs
+        self.sum += other.sum
+        self.exceeded += other.exceeded
+        self.sketch.merge(other.sketch)
+        return self
+
+    def frame(self, values):
+        """DataFrame of (months x columns) `values`"""
+        return pd.DataFrame(values, index=self.dates, columns=self.columns)
+
+    def mean(self):
+        """Mean value of each month and account"""
+        return self.frame(self.sum / self.runs)
+
+    def bands(self, quantiles=None):
+        """Quantile fan bands, returns a Panel with an item for each of the `quantiles` (0 to 1, `FAN_QUANTILES` by default)"""
+        quantiles = quantiles if quantiles else FAN_QUANTILES
+        values = self.sketch.quantile(quantiles)
+        return pd.Panel({q: self.frame(v) for q, v in zip(quantiles, values)})
+
+    def probability(self, threshold):
+        """Probability of each month and account being at or above `threshold` (one of the summary's `thresholds`)"""
+        return self.frame(self.exceeded[self.thresholds.index(threshold)] / self.runs)
+
+def shard_randoms(seed=None, shards=1):
+    """
+    Independent random states of `shards` derived from one `seed`, with `SeedSequence.spawn` where numpy has it, otherwise
+    seeded by (`seed`, shard) like `pf.synthetic.stream_random()`.
+    """
+    sequence = getattr(np.random, 'SeedSequence', None)
+    if sequence is not None:
+        return [np.random.RandomState(np.random.MT19937(child)) for child in sequence(seed).spawn(shards)]
+    seed = np.random.RandomState().randint(2 ** 31 - 1) if seed is None else seed
+    return [np.random.RandomState([seed, shard]) for shard in range(shards)]
+
+def simulate_shard(job):
+    """
+    Simulate one shard of runs, `job` is a picklable (simulate, runs, random, summary) tuple for a process pool. Returns the
+    paths, or their `ForecastSummary` if `summary` arguments (dates, keys, thresholds) are given.
+    """
+    simulate, number_of_runs, random, summary = job
+    paths = simulate(number_of_runs, random)
+    return ForecastSummary(*summary).update(paths) if summary else paths
+
+def run_forecast(
+        simulate,
+        dates,
+        keys,
+        number_of_runs=1000,
+        seed=None,
+        output='panel',
+        chunksize=MONTE_CARLO_CHUNK_SIZE,
+        thresholds=None,
+        filepath=None,
+        processes=1
+    ):
+    """
+    Run `number_of_runs` Monte Carlo paths in shards of `chunksize` runs. `simulate(runs, random)` returns a (runs x months x
+    accounts) array of paths, it must be picklable (e.g. a `functools.partial` of a module function) to use processes.
+
+    Every shard draws from its own random stream derived from `seed` (see `shard_randoms()`) and shards are collected in order,
+    so shards can be simulated by `processes` worker processes (1 runs serially in this process, None uses all cores) and a
+    given `seed` and `chunksize` give bit-identical results with any number of processes. Summaries are built per shard by the
+    workers and merged in shard order.
+
+    The `output` is either a `panel` of all runs (items) by `dates` (major axis) and `keys` (minor axis), a `summary` (see
+    `ForecastSummary`) that keeps no runs, for run counts whose paths do not fit in memory, or a `memmap` that writes every run
+    to the `.npy` `filepath` and returns the reopened `ForecastPaths`, for paths larger than memory that are sliced later.
+    """
+    if output == 'panel':
+        result = np.empty((number_of_runs, len(dates), len(keys)))
+    elif output == 'summary':
+        result = ForecastSummary(dates, keys, thresholds)
+    elif output == 'memmap':
+        result = create_store(filepath, [('Run', None), ('Date', dates), ('Account', keys)], number_of_runs)
+    else:
+        raise ValueError('Unknown forecast output: {}'.format(output))
+
+    # Shards of runs with independent random streams
+    begins = range(0, number_of_runs, chunksize)
+    randoms = shard_randoms(seed, len(begins))
+    summary = (dates, keys, thresholds) if output == 'summary' else None
+    jobs = (
+        (simulate, min(begin + chunksize, number_of_runs) - begin, random, summary) for begin, random in zip(begins, randoms)
+    )
+
+    # Collect shards in order
+    progress = pf.util.ProgressBar(number_of_runs)
+    pool = multiprocessing.Pool(processes) if processes != 1 else None
+    try:
+        shards = pool.imap(simulate_shard, jobs) if pool else (simulate_shard(job) for job in jobs)
+        for shard, paths in enumerate(shards):
+            if output == 'summary':
+                result.merge(paths)
+            else:
+                result[begins[shard]:begins[shard] + len(paths)] = paths
+            progress.update_iteration(min(begins[shard] + chunksize, number_of_runs))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    progress.close()
+
+    if output == 'panel':
+        return pd.Panel(data=result, items=range(number_of_runs), major_axis=dates, minor_axis=keys)
+    elif output == 'memmap':
+        result.flush()
+        del result
+        return ForecastPaths(filepath)
+    return result
+
+def independent_paths(init_values, samplers, months, number_of_runs, random):
+    """Paths of accounts drawn independently from their fit distribution `samplers` (see `pf.util.model_sampler()`)"""
+    paths = np.empty((number_of_runs, months, len(samplers)))
+    for i, sampler in enumerate(samplers):
+        paths[:, :, i] = sampler.sample((number_of_runs, months), random)
+    return compound_changes(paths, init_values)
+
+def monte_carlo_forecast(
+        accounts,
+        account_models,
+        start,
+        number_of_runs=1000,
+        seed=None,
+        output='panel',
+        chunksize=MONTE_CARLO_CHUNK_SIZE,
+        thresholds=None,
+        filepath=None,
+        processes=1,
+        tables=True,
+        **kwds
+    ):
+    """
+    Forecast accounts with Monte Carlo method from fit distributions, returns a Panel of runs (or a `ForecastSummary`, see
+    `run_forecast()` for `output` modes). Distributions are sampled from inverse CDF lookup tables where that is cheaper than
+    exact sampling for the number of runs and months (see `pf.util.model_sampler()`) unless `tables` is False.
+    """
 
     # Determine times
     forecast_start = start
     forecast_end = start + pd.DateOffset(**kwds)
     forecast_dates = pd.date_range(forecast_start, forecast_end, freq='MS')
 
-    # Empty Panel to store Monte Carlo runs
-    account_forecast_runs = pd.Panel(
-        data=np.zeros((number_of_runs, len(forecast_dates), len(account_models.keys()))),
-        items=range(number_of_runs),
-        major_axis=forecast_dates,
-        minor_axis=account_models.keys()
+    # Draw every month of a chunk of runs at once for each account
+    keys = list(account_models.keys())
+    draws = number_of_runs * len(forecast_dates)
+    simulate = functools.partial(
+        independent_paths,
+        initial_values(accounts, keys),
+        [pf.util.model_sampler(*account_models[key], table=tables, draws=draws) for key in keys],
+        len(forecast_dates)
     )
 
-    # Forecast each account
-    accounts_forecast = pd.DataFrame(columns=account_models.keys())
-    for account_type, account in accounts_forecast:
+    return run_forecast(
+        simulate, forecast_dates, keys, number_of_runs, seed, output, chunksize, thresholds, filepath, processes
+    )
+
+################################################################################################################################
+# Stored Runs
+################################################################################################################################
+def store_metadata_file(filepath):
+    """Metadata file (`.json`) next to a `.npy` store"""
+    return os.path.splitext(filepath)[0] + '.json'
+
+def create_store(filepath, axes, length=None, dtype=np.float64):
+    """
+    Create a `.npy` file backed array to write into, returns a writable `np.memmap`. `axes` is a list of (name, labels) of each
+    axis, saved in a metadata file (`.json`) next to it. Labels of `None` are positions, their axis needs a `length`.
+
+    Dates are saved as `YYYY-MM-DD` strings (axes named `Date`), so any labeled result (e.g. Monte Carlo runs or a scenario
+    sweep) can be written once and reopened by `open_store()`.
+    """
+    shape = tuple(length if labels is None else len(labels) for _, labels in axes)
+    meta = {
+        'shape': list(shape),
+        'axes': [
+            [name, None if labels is None else [str(x.date()) if name == 'Date' else x for x in labels]]
+            for name, labels in axes
+        ]
+    }
+    with open(store_metadata_file(filepath), 'w') as f:
+        json.dump(meta, f)
+    return np.lib.format.open_memmap(filepath, mode='w+', dtype=dtype, shape=shape)
+
+def open_store(filepath, mode='r'):
+    """
+    Lazily open a store written by `create_store()` without reading it, returns the `np.memmap` and the list of (name, labels)
+    of each axis (positions for axes without labels).
+    """
+    with open(store_metadata_file(filepath), 'r') as f:
+        meta = json.load(f)
+    values = np.load(filepath, mmap_mode=mode)
+    axes = []
+    for (name, labels), length in zip(meta['axes'], values.shape):
+        if labels is None:
+            labels = range(length)
+        elif name == 'Date':
+            labels = pd.DatetimeIndex(labels)
+        else:
+            labels = [tuple(x) if isinstance(x, list) else x for x in labels]
+        axes.append((name, labels))
+    return values, axes
+
+class ForecastPaths(object):
+    """
+    Monte Carlo runs stored on disk by `run_forecast(..., output='memmap')`, sliced without loading the whole file.
+
+    Example:
+    ```
+    paths = monte_carlo_forecast(accounts, models, start, number_of_runs=100000, output='memmap', filepath='runs.npy', years=30)
+    paths = ForecastPaths('runs.npy')  # later, e.g. after a restart
+    paths.account(('Investment', '401k')).quantile(0.5)
+    ```
+    """
 
-        # Get initial account value
-        init_value = accounts[(account_type, account)].iloc[-1]
-        if any(init_value == _ for _ in [np.inf, -np.inf, np.nan]):
-            init_value = 1.0
-
-        # Get model
-        model_name, params = account_models[(account_type, account)]
-        model = getattr(st, model_name)
-
-        if model:
-            arg = params[:-2]
-            loc = params[-2]
-            scale = params[-1]
-
-            # Forecast into future with Monte Carlo
-            for run in xrange(number_of_runs):
-                # Generate random variables
-                forecast_rvs = model.rvs(loc=loc, scale=scale, size=len(forecast_dates), *arg)
-                # Create Series of percent changes from random variables
-                forecast_pct_change = pd.Series(forecast_rvs, index=forecast_dates)
-                # Clip unrealistic changes larger than +/-50% in once month
-                forecast_pct_change = forecast_pct_change.clip(-0.5, 0.5)
-                # Forecast account as monthly percent change from last known account value
-                forecast_pct = np.exp(forecast_pct_change.copy())
-                forecast_pct[0] = forecast_pct[0] * init_value
-                forecast = forecast_pct.cumprod()
-                # Add to run storage
-                account_forecast_runs[run][(account_type, account)] = forecast
-
-    return account_forecast_runs
+    def __init__(self, filepath, mode='r'):
+        """Open the runs stored at `filepath`"""
+        self.filepath = filepath
+        self.values, ((_, self.runs), (_, self.dates), (_, self.keys)) = open_store(filepath, mode)
+
+    def __len__(self):
+        """Number of runs"""
+        return len(self.values)
+
+    def run(self, run=0):
+        """DataFrame of one `run`, indexed by date with a column for each account"""
+        return pd.DataFrame(self.values[run], index=self.dates, columns=self.keys)
+
+    def account(self, key=None):
+        """DataFrame of one account `key`, indexed by run with a column for each date"""
+        return pd.DataFrame(self.values[:, :, self.keys.index(key)], index=self.runs, columns=self.dates)
+
+    def panel(self, runs=None):
+        """Load `runs` (a slice or positions, all by default) into a Panel like `monte_carlo_forecast()`"""
+        runs = slice(None) if runs is None else runs
+        return pd.Panel(
+            data=np.asarray(self.values[runs]),
+            items=np.arange(len(self))[runs],
+            major_axis=self.dates,
+            minor_axis=self.keys
+        )
+
+    def summary(self, thresholds=None, chunksize=MONTE_CARLO_CHUNK_SIZE):
+        """Summarize the stored runs in chunks, returns a `ForecastSummary`"""
+        summary = ForecastSummary(self.dates, self.keys, thresholds)
+        for begin in xrange(0, len(self), chunksize):
+            summary.update(np.asarray(self.values[begin:begin + chunksize]))
+        return summary
+
+################################################################################################################################
+# Correlated Forecasting
+################################################################################################################################
+def nearest_correlation(correlation):
+    """Nearest valid (positive definite, unit diagonal) correlation matrix by clipping eigenvalues, NaNs are uncorrelated"""
+    correlation = np.where(np.isfinite(correlation), correlation, 0.0)
+    np.fill_diagonal(correlation, 1.0)
+    values, vectors = np.linalg.eigh(0.5 * (correlation + correlation.T))
+    correlation = (vectors * np.maximum(values, MIN_CORRELATION_EIGENVALUE)).dot(vectors.T)
+    scale = 1.0 / np.sqrt(np.diag(correlation))
+    return correlation * np.outer(scale, scale)
+
+def gaussian_copula(accounts, account_models=None):
+    """
+    Estimate the Gaussian copula correlation of the monthly log changes of the accounts in `account_models` (all accounts if not
+    given), returns a DataFrame correlation matrix.
+
+    Changes are converted to normal scores by rank, so the dependence does not rely on how well the marginals are fit. The
+    correlation is pairwise over months both accounts have data, then adjusted to the nearest valid correlation matrix.
+    """
+    keys = list(account_models.keys()) if account_models else list(accounts.columns)
+    changes = account_changes(accounts[keys])
+
+    # Normal scores of ranks, (rank - 0.5) / n keeps scores finite
+    with np.errstate(invalid='ignore'):
+        scores = st.norm.ppf((changes.rank() - 0.5) / changes.count())
+
+    correlation = pd.DataFrame(scores, index=changes.index, columns=changes.columns).corr().values
+    return pd.DataFrame(nearest_correlation(correlation), index=changes.columns, columns=changes.columns)
+
+def correlated_paths(init_values, samplers, cholesky, months, number_of_runs, random):
+    """
+    Paths of accounts drawn jointly: correlated normal shocks of every run, month and account from one `cholesky` transform,
+    mapped through each account's fit distribution `samplers` (see `pf.util.model_sampler()`)
+    """
+    paths = random.standard_normal((number_of_runs, months, len(samplers))).dot(cholesky.T)
+    for i, sampler in enumerate(samplers):
+        paths[:, :, i] = sampler.ppf(st.norm.cdf(paths[:, :, i]))
+    return compound_changes(paths, init_values)
+
+def correlated_monte_carlo_forecast(
+        accounts,
+        account_models,
+        start,
+        number_of_runs=1000,
+        correlation=None,
+        seed=None,
+        output='panel',
+        chunksize=MONTE_CARLO_CHUNK_SIZE,
+        thresholds=None,
+        filepath=None,
+        processes=1,
+        tables=True,
+        **kwds
+    ):
+    """
+    Forecast accounts jointly with Monte Carlo, correlated random draws from each account's fit distribution (see
+    `dist_fit_model()`), returns a Panel of runs like `monte_carlo_forecast()` (or a `ForecastSummary`, see `run_forecast()`).
+
+    The dependence between accounts is a Gaussian copula, estimated by `gaussian_copula()` unless a `correlation` is given.
+    Correlated normal shocks of every run, month and account are drawn with one Cholesky transform, then mapped through each
+    account's marginal distribution, so investment and cash accounts move together while keeping their own distributions.
+    Marginals are looked up in inverse CDF tables where that is cheaper than the exact `ppf` (see `pf.util.model_sampler()`)
+    unless `tables` is False.
+    """
+
+    # Determine times
+    forecast_start = start
+    forecast_end = start + pd.DateOffset(**kwds)
+    forecast_dates = pd.date_range(forecast_start, forecast_end, freq='MS')
+
+    # Dependence between accounts, in account model order
+    keys = list(account_models.keys())
+    if correlation is None:
+        correlation = gaussian_copula(accounts, account_models)
+    cholesky = np.linalg.cholesky(nearest_correlation(pd.DataFrame(correlation).loc[keys, keys].values))
+
+    simulate = functools.partial(
+        correlated_paths,
+        initial_values(accounts, keys),
+        [
+            pf.util.model_sampler(*account_models[key], table=tables, draws=number_of_runs * len(forecast_dates), by_ppf=True)
+            for key in keys
+        ],
+        cholesky,
+        len(forecast_dates)
+    )
+
+    return run_forecast(
+        simulate, forecast_dates, keys, number_of_runs, seed, output, chunksize, thresholds, filepath, processes
+    )
+
+################################################################################################################################
+# Bootstrap Forecasting
+################################################################################################################################
+def block_indices(length, months, number_of_runs=1000, block_size=BOOTSTRAP_BLOCK_SIZE, random=None):
+    """
+    Indices of a circular block bootstrap into `length` historical months, returns a (runs x months) array made of blocks of
+    `block_size` consecutive months starting at random months (wrapping around the end of history).
+    """
+    random = random if random else np.random.RandomState()
+    block_size = max(1, min(block_size, length))
+    blocks = -(-months // block_size)
+    starts = random.randint(0, length, size=(number_of_runs, blocks, 1))
+    indices = (starts + np.arange(block_size)) % length
+    return indices.reshape((number_of_runs, blocks * block_size))[:, :months]
+
+def bootstrap_paths(changes, init_values, months, block_size, number_of_runs, random):
+    """Paths of accounts from blocks of the (months x accounts) historical `changes` matrix"""
+    return compound_changes(changes[block_indices(len(changes), months, number_of_runs, block_size, random)], init_values)
+
+def bootstrap_forecast(
+        accounts,
+        start,
+        number_of_runs=1000,
+        block_size=BOOTSTRAP_BLOCK_SIZE,
+        keys=None,
+        seed=None,
+        output='panel',
+        chunksize=MONTE_CARLO_CHUNK_SIZE,
+        thresholds=None,
+        filepath=None,
+        processes=1,
+        **kwds
+    ):
+    """
+    Forecast accounts by block bootstrap of their historical monthly log returns, no distributions are fit. Returns a Panel of
+    runs like `monte_carlo_forecast()` (or a `ForecastSummary`, see `run_forecast()`) for the accounts in `keys` (all accounts
+    if not given).
+
+    Each run strings together blocks of `block_size` consecutive historical months, with the same months for every account, so
+    the correlation between accounts and the autocorrelation within a block are kept. Months an account has no return (Infs and
+    NaNs) are no change. Every path is gathered at once by indexing the (months x accounts) log return matrix, so an account
+    growing at a constant rate keeps growing at that rate.
+    """
+
+    # Determine times
+    forecast_start = start
+    forecast_end = start + pd.DateOffset(**kwds)
+    forecast_dates = pd.date_range(forecast_start, forecast_end, freq='MS')
+
+    # Historical log return matrix, the first month has no return
+    keys = list(keys) if keys is not None else list(accounts.columns)
+    changes = log_returns(accounts[keys]).iloc[1:].fillna(0.0).values
+
+    simulate = functools.partial(
+        bootstrap_paths,
+        changes,
+        initial_values(accounts, keys),
+        len(forecast_dates),
+        block_size
+    )
+
+    return run_forecast(
+        simulate, forecast_dates, keys, number_of_runs, seed, output, chunksize, thresholds, filepath, processes
+    )
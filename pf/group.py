@@ -0,0 +1,226 @@
+"""
+group.py
+
+Pooled finance group functions, aggregating the accounts and summaries of many members at once.
+
+project    : pf
+version    : 0.0.0
+status     : development
+modifydate :
+createdate :
+website    : https://github.com/tmthydvnprt/pf
+author     : tmthydvnprt
+email      : tim@tmthydvnprt.com
+maintainer : tmthydvnprt
+license    : MIT
+copyright  : Copyright 2016, tmthydvnprt
+credits    :
+
+"""
+from __future__ import division
+
+import numpy as np
+import pandas as pd
+
+from pf.accounting import summary_ratios, calculate_stats
+from pf.constants import METRIC_AVERAGED
+
+################################################################################################################################
+# Stacking Member Data
+################################################################################################################################
+def stack_accounts(members=None):
+    """
+    Stack many members' `accounts` DataFrames (see `pf.io.read_in_accounts()`) into one long columnar DataFrame, with one row
+    per member, date and account and the columns `Member`, `Date`, `Type`, `Account` and `Balance`.
+
+    `members` is a dictionary of member names and their `accounts` DataFrame. Members do not need to share the same accounts.
+
+    Example:
+    ```
+    stacked = stack_accounts({'alice': alice_accounts, 'bob': bob_accounts})
+    ```
+    """
+
+    # Stack each member to long form and concatenate keyed by member
+    stacked = pd.concat(
+        [accounts.stack([0, 1]) for accounts in members.values()],
+        keys=list(members.keys()),
+        names=['Member', 'Date', 'Type', 'Account']
+    ).reset_index(name='Balance')
+
+    # Repeated account labels are stored as categoricals
+    for col in ['Type', 'Account']:
+        stacked[col] = stacked[col].astype('category')
+
+    return stacked
+
+def stack_summaries(summaries=None):
+    """
+    Stack many members' summary DataFrames (see `pf.accounting.summary_statement()`) into one DataFrame indexed by
+    (`Member`, `Date`).
+    """
+    return pd.concat(list(summaries.values()), keys=list(summaries.keys()), names=['Member', 'Date'])
+
+################################################################################################################################
+# Group Calculations
+################################################################################################################################
+def group_net_worth(stacked=None):
+    """
+    Calculate Net Worth (Assets - Debts) of every member from `stack_accounts()` output in one groupby pass, returns a DataFrame
+    indexed by (`Member`, `Date`) with the same columns as `pf.accounting.calculate_net_worth()`.
+    """
+
+    # Aggregate accounts by assets and debts
+    balance = stacked['Balance']
+    net_worth = pd.DataFrame({
+        'Member': stacked['Member'],
+        'Date': stacked['Date'],
+        'Assets': balance.where(balance > 0.0, 0.0),
+        'Debts': balance.where(balance < 0.0, 0.0)
+    }).groupby(['Member', 'Date']).sum()[['Assets', 'Debts']]
+
+    # Calculate Net Worth
+    net_worth['Net'] = net_worth['Assets'] + net_worth['Debts']
+
+    # Calculate Debt Ratio
+    net_worth['Debt Ratio'] = 100.0 * (net_worth['Debts'].abs() / net_worth['Assets'])
+
+    # Calculate Dollar and Percent Change within each member
+    return add_changes(net_worth, level='Member')
+
+def add_changes(net_worth=None, level=None):
+    """
+    Add the Dollar and Percent Change columns of Assets, Debts and Net to `net_worth` (within each `level` group if given),
+    returns the DataFrame.
+    """
+    values = net_worth[['Assets', 'Debts', 'Net']]
+    grouped = values.groupby(level=level) if level else values
+    change = grouped.diff(1).fillna(0.0)
+    pct_change = 100.0 * grouped.pct_change().fillna(0.0)
+    for x in ['Assets', 'Debts', 'Net']:
+        net_worth['{} Change ($)'.format(x)] = change[x]
+        net_worth['{} Change (%)'.format(x)] = pct_change[x]
+
+    return net_worth
+
+def category_mapping(category_dict=None):
+    """
+    Flatten a balance `category_dict` (see `pf.accounting.calc_balance()`) into a DataFrame mapping account selectors to the
+    (Category, Type, Item) they belong to. Tuple selectors fill `Type` and `Account`, level 0 selectors only fill `Type`.
+    """
+    mapping = pd.DataFrame(
+        [
+            (selector[0], selector[1], k0, k1, k2) if isinstance(selector, tuple) else (selector, np.nan, k0, k1, k2)
+            for k0, v0 in category_dict.iteritems()
+            for k1, v1 in v0.iteritems()
+            for k2, v2 in v1.iteritems()
+            for selector in v2
+        ],
+        columns=['Type', 'Account', 'Category', 'Section', 'Item']
+    )
+    return mapping
+
+def group_balance(stacked=None, category_dict=None):
+    """
+    Calculate balances of grouped assets/liabilities for every member from `stack_accounts()` output in one groupby pass,
+    returns a DataFrame indexed by (`Member`, `Date`) with the same columns as `pf.accounting.calc_balance()`.
+
+    Like `calc_balance()`, a KeyError is raised for selectors that match no accounts, here of any member.
+    """
+
+    # Join accounts to their categories, by account and by account type
+    mapping = category_mapping(category_dict)
+    by_account = mapping.dropna(subset=['Account'])
+    by_type = mapping[mapping['Account'].isnull()].drop('Account', axis=1)
+    accounts = stacked.astype({'Type': object, 'Account': object})
+
+    # Selectors without accounts are likely typos, fail like `calc_balance()`
+    pairs = accounts[['Type', 'Account']].drop_duplicates()
+    selectors = set(pairs['Type']) | set(zip(pairs['Type'], pairs['Account']))
+    missing = sorted(
+        {(t, a) for t, a in zip(by_account['Type'], by_account['Account']) if (t, a) not in selectors} |
+        {t for t in by_type['Type'] if t not in selectors}
+    )
+    if missing:
+        raise KeyError('Category selectors match no accounts: {}'.format(missing))
+    categorized = pd.concat([
+        accounts.merge(by_account, on=['Type', 'Account']),
+        accounts.merge(by_type, on=['Type'])
+    ])
+
+    # Sum each category
+    balance = categorized \
+        .groupby(['Member', 'Date', 'Category', 'Section', 'Item'])['Balance'] \
+        .sum() \
+        .unstack(['Category', 'Section', 'Item'])
+
+    # Categories without any accounts are zero
+    cols = pd.MultiIndex.from_tuples(sorted(
+        (k0, k1, k2)
+        for k0, v0 in category_dict.iteritems()
+        for k1, v1 in v0.iteritems()
+        for k2 in v1
+    ))
+    balance = balance.reindex(columns=cols)
+    balance.columns.names = [None, None, None]
+
+    return balance.fillna(0.0)
+
+def group_metrics(stacked_summary=None, swr=0.04):
+    """
+    Calculate `pf.accounting.calc_metrics()` for every member from `stack_summaries()` output, the lifetime averages are
+    calculated within each member with grouped cumulative sums.
+    """
+
+    # Create mean from month to month yearly estimates within each member
+    summary = stacked_summary.copy()
+    by_member = summary[METRIC_AVERAGED].groupby(level='Member')
+    summary[METRIC_AVERAGED] = by_member.cumsum().div(by_member.cumcount() + 1.0, axis=0)
+
+    return summary_ratios(summary, swr=swr)
+
+################################################################################################################################
+# Pooled Totals
+################################################################################################################################
+def pooled_totals(net_worth=None):
+    """
+    Calculate pooled Assets, Debts and Net of a group from `group_net_worth()` output, along with the number of members with
+    data on each date.
+    """
+    by_date = net_worth.groupby(level='Date')
+    totals = by_date[['Assets', 'Debts', 'Net']].sum()
+    totals['Debt Ratio'] = 100.0 * (totals['Debts'].abs() / totals['Assets'])
+    totals['Members'] = by_date.size()
+    return totals
+
+def pooled_net_worth(net_worth=None):
+    """
+    Calculate the Net Worth of a group as a whole from `group_net_worth()` output, returns a DataFrame indexed by `Date` with
+    the same columns, changes are of the pooled totals.
+    """
+    pooled = pooled_totals(net_worth)[['Assets', 'Debts', 'Net', 'Debt Ratio']]
+    return add_changes(pooled)[net_worth.columns]
+
+def member_contributions(net_worth=None):
+    """
+    Calculate each member's contribution to the pooled Assets, Debts and Net of a group from `group_net_worth()` output,
+    returns a DataFrame indexed by (`Member`, `Date`) of percentages.
+    """
+    cols = ['Assets', 'Debts', 'Net']
+    totals = net_worth[cols].groupby(level='Date').transform('sum')
+    contributions = 100.0 * net_worth[cols] / totals
+    contributions.columns = ['{} Contribution (%)'.format(x) for x in cols]
+    return contributions.replace([-np.inf, np.inf], np.nan)
+
+def group_stats(net_worth=None, quantiles=None):
+    """
+    Calculate the statistics of every member and of the pooled group from `group_net_worth()` output (see
+    `pf.accounting.calculate_stats()`), returns a DataFrame indexed by (`Member`, column). The `Group` statistics are of the
+    pooled totals (see `pooled_net_worth()`), e.g. its Current is the latest household total.
+    """
+    stats = net_worth.groupby(level='Member').apply(
+        lambda frame: calculate_stats(frame.reset_index(level='Member', drop=True), quantiles)
+    )
+    group = calculate_stats(pooled_net_worth(net_worth), quantiles)
+    group.index = pd.MultiIndex.from_product([['Group'], group.index], names=stats.index.names)
+    return pd.concat([stats, group])
@@ -0,0 +1,196 @@
+"""
+instrument.py
+
+Opt-in timing instrumentation of the public functions of pf modules.
+
+Instrumentation replaces the public functions of `pf.io`, `pf.accounting`, `pf.forecasting` and `pf.util` (by default) with
+wrappers that record call counts, wall time, rows processed and growth of the process' memory high-water mark in an
+in-process registry. Nothing is wrapped until `enable()` is called and `disable()` puts the original functions back, so the
+disabled path has no overhead.
+
+Example:
+```
+import pf.instrument
+with pf.instrument.instrumented():
+    summary = summary_statement(...)
+print pf.instrument.report()
+```
+
+project    : pf
+version    : 0.0.0
+status     : development
+modifydate :
+createdate :
+website    : https://github.com/tmthydvnprt/pf
+author     : tmthydvnprt
+email      : tim@tmthydvnprt.com
+maintainer : tmthydvnprt
+license    : MIT
+copyright  : Copyright 2016, tmthydvnprt
+credits    :
+
+"""
+from __future__ import division
+
+import sys
+import json
+import time
+import inspect
+import resource
+import functools
+import contextlib
+import numpy as np
+import pandas as pd
+
+################################################################################################################################
+# Instrumentation Constants
+################################################################################################################################
+DEFAULT_MODULES = ['pf.io', 'pf.accounting', 'pf.forecasting', 'pf.util']
+
+# ru_maxrss is in kilobytes on Linux and bytes on macOS
+MAXRSS_TO_MB = 1.0 / (1024.0 * 1024.0) if sys.platform == 'darwin' else 1.0 / 1024.0
+
+REPORT_COLUMNS = ['Calls', 'Total Time [s]', 'Mean Time [s]', 'Max Time [s]', 'Rows', 'Rows/s', 'Max RSS Growth [MB]']
+
+################################################################################################################################
+# Registry
+################################################################################################################################
+# Statistics of each instrumented function, keyed by `module.function`
+REGISTRY = {}
+
+# Original functions replaced by wrappers: (module, attribute name, original function)
+PATCHED = []
+
+def reset():
+    """Clear all recorded statistics"""
+    REGISTRY.clear()
+
+def count_rows(args=None, kwds=None):
+    """Rows processed by a call, the length of the longest DataFrame, Series or array argument"""
+    rows = 0
+    for arg in list(args) + list(kwds.values()):
+        if isinstance(arg, (pd.DataFrame, pd.Series, np.ndarray)) and arg.ndim > 0:
+            rows = max(rows, len(arg))
+    return rows
+
+def record(name='', elapsed=0.0, rows=0, maxrss_growth=0.0):
+    """Add one call to the statistics of function `name`"""
+    stats = REGISTRY.get(name)
+    if stats is None:
+        stats = REGISTRY[name] = {'calls': 0, 'time': 0.0, 'max_time': 0.0, 'rows': 0, 'maxrss_growth_mb': 0.0}
+    stats['calls'] += 1
+    stats['time'] += elapsed
+    stats['max_time'] = max(stats['max_time'], elapsed)
+    stats['rows'] += rows
+    stats['maxrss_growth_mb'] = max(stats['maxrss_growth_mb'], maxrss_growth)
+
+def instrument(func=None, name=None):
+    """
+    Wrap `func` so each call is recorded in the registry under `name`. Wall time includes nested instrumented calls.
+
+    Memory is the growth of the process' high-water mark (maximum resident set size) during a call, not the call's own peak: a
+    call that stays below an earlier peak records 0, so compare functions on fresh processes (e.g. `benchmarks/benchmark.py`)
+    to measure their peak memory.
+    """
+    name = name if name else '{}.{}'.format(func.__module__, func.__name__)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwds):
+        """Instrumented function"""
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.time()
+        try:
+            return func(*args, **kwds)
+        finally:
+            elapsed = time.time() - start
+            maxrss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - maxrss) * MAXRSS_TO_MB
+            record(name, elapsed, count_rows(args, kwds), maxrss_growth)
+
+    wrapper.instrumented = func
+    return wrapper
+
+################################################################################################################################
+# Enabling
+################################################################################################################################
+def public_functions(module=None):
+    """Public functions defined in `module`, returns a dictionary of names and functions"""
+    return {
+        name: obj for name, obj in vars(module).items()
+        if not name.startswith('_') and inspect.isfunction(obj) and obj.__module__ == module.__name__
+    }
+
+def enable(modules=None):
+    """
+    Instrument the public functions of `modules` (names, `DEFAULT_MODULES` by default). Every loaded pf module that imported one
+    of these functions by name (e.g. `from pf.util import get_ages`) is patched too, so calls between modules are recorded.
+    """
+    if PATCHED:
+        disable()
+
+    # Wrap public functions
+    wrappers = {}
+    for module_name in modules if modules else DEFAULT_MODULES:
+        __import__(module_name)
+        for func in public_functions(sys.modules[module_name]).values():
+            wrappers[func] = instrument(func)
+
+    # Replace every reference in loaded pf modules
+    for module_name, module in sys.modules.items():
+        if module is None or not (module_name == 'pf' or module_name.startswith('pf.')) or module_name == __name__:
+            continue
+        for name, obj in vars(module).items():
+            if inspect.isfunction(obj) and obj in wrappers:
+                PATCHED.append((module, name, obj))
+                setattr(module, name, wrappers[obj])
+
+def disable():
+    """Restore the original functions"""
+    while PATCHED:
+        module, name, func = PATCHED.pop()
+        setattr(module, name, func)
+
+def is_enabled():
+    """Whether instrumentation is enabled"""
+    return bool(PATCHED)
+
+@contextlib.contextmanager
+def instrumented(modules=None, clear=True):
+    """Context manager enabling instrumentation of `modules` (see `enable()`), the registry is reset first if `clear` is set"""
+    if clear:
+        reset()
+    enable(modules)
+    try:
+        yield REGISTRY
+    finally:
+        disable()
+
+################################################################################################################################
+# Reporting
+################################################################################################################################
+def report(sort='Total Time [s]'):
+    """Recorded statistics as a DataFrame with one row per function, sorted by `sort` column (descending)"""
+    table = pd.DataFrame(
+        [
+            (
+                name,
+                stats['calls'],
+                stats['time'],
+                stats['time'] / stats['calls'],
+                stats['max_time'],
+                stats['rows'],
+                stats['rows'] / stats['time'] if stats['time'] else np.nan,
+                stats['maxrss_growth_mb']
+            )
+            for name, stats in REGISTRY.items()
+        ],
+        columns=['Function'] + REPORT_COLUMNS
+    ).set_index('Function')
+    return table.sort_values(sort, ascending=False)
+
+def to_json(filepath=None):
+    """Dump recorded statistics as `json`, to `filepath` if given, returns the `json` string"""
+    text = json.dumps(REGISTRY, indent=4, sort_keys=True)
+    if filepath:
+        with open(filepath, 'w') as f:
+            f.write(text)
+    return text
@@ -21,19 +21,22 @@ from __future__ import division
 
 import re
 import os
+import csv
+import json
 import glob
+import multiprocessing
 import cStringIO
 import numpy as np
 import pandas as pd
 
 from pdfminer.pdfparser import PDFParser
 from pdfminer.pdfdocument import PDFDocument
-from pdfminer.pdfpage import PDFPage, PDFTextExtractionNotAllowed
+from pdfminer.pdfpage import PDFPage
 from pdfminer.converter import TextConverter
 from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
 from pdfminer.layout import LAParams
 
-from pf.constants import DATE_RE
+from pf.constants import PAYCHECK_SPEC, PDF_PAGES_PER_PROCESS, PDF_POOL_MIN_BYTES
 from pf.util import read_date_csv_file
 
 ################################################################################################################################
@@ -231,13 +234,16 @@ def set_paycheck_sign(paychecks, paycheck_negative_categories):
     """
     Set the sign of each paycheck category. Paycheck reading make all values absolute for ease,
     negative signed values will need to be reset. `paycheck_negative_categories` is a list of column names.
+    Non-numeric columns (e.g. `Employer`) are left as they are.
 
     """
 
-    # Set sign of each column
-    sign = pd.Series(np.ones(len(paychecks.columns)), index=paychecks.columns)
+    # Set sign of each numeric column
+    numeric = paychecks.select_dtypes(include=[np.number]).columns
+    sign = pd.Series(np.ones(len(numeric)), index=numeric)
     sign[paycheck_negative_categories] = -1
-    paychecks = sign * paychecks
+    paychecks = paychecks.copy()
+    paychecks[numeric] = sign * paychecks[numeric]
 
     return paychecks
 
@@ -247,7 +253,7 @@ def standardize_paycheck(paychecks, categories):
 
     Categories is a dictionary of user category keys with standard category values.  Duplicate
     standard categories will be summed. A standard category value of "drop" will ignore that user
-    category in resulting output.
+    category in resulting output. Non-numeric columns (e.g. `Employer`) are kept as they are.
 
     Standard Categories should be:
     salary
@@ -277,6 +283,9 @@ def standardize_paycheck(paychecks, categories):
     # Create empty DataFrame
     std_paychecks = pd.DataFrame([], index=paychecks.index)
     for col in paychecks.columns:
+        if paychecks[col].dtype == object:
+            std_paychecks[col] = paychecks[col]
+            continue
         std_col = categories[col]
         if std_col != "drop":
             # If category already exists add to category
@@ -288,186 +297,277 @@ def standardize_paycheck(paychecks, categories):
 
     return std_paychecks
 
-def paycheck_parser(paychecks_dict=None):
+class PaycheckParser(object):
     """
-    User defined function to convert dictonary of paycheck list of lists into a DataFrame. You could always replace of the whole
-    function or you can use the default one as a starting point.  This fuction is called from within `read_in_paychecks()`.
+    Pay stub parser compiled from a declarative layout `spec` (see `pf.constants.PAYCHECK_SPEC` for the format). Instances are
+    called with a dictionary of paycheck texts and return a DataFrame, so they can be passed as the `parser` of
+    `read_in_paychecks()`.
 
-    Necessary user defined parts are sectioned off with `#####`.
+    The spec is compiled once: every section anchor goes into a single alternation so each line outside a section is searched
+    once, and lines inside a section are handled by that section's state without any regex.
 
+    Example:
+    ```
+    spec = copy.deepcopy(pf.constants.PAYCHECK_SPEC)
+    spec[0]['anchor'] = 'Pay Date:'
+    paychecks = read_in_paychecks('/path/to/paycheck/directory/*.pdf', parser=PaycheckParser(spec))
+    ```
     """
-    #pylint: disable=too-many-branches,too-many-statements,too-many-locals
-    # User Defined Constants like precompiled regex
-    ############################################################################################################################
-    check_date_re = re.compile(r'.*Check Date: +(.*?) +.*')
-    baserate_re = re.compile(r'(.*) Base Rate:')
-    top_re = re.compile(r'Total Gross')
-    earnings_re = re.compile(r'Earnings')
-    end_re = re.compile(r'Total:')
-    deductions_re = re.compile(r'Description')
-    ############################################################################################################################
-
-    # Loop thru dictionary (these lines are generic)
-    paychecks = []
-    for _, paycheck_text in paychecks_dict.items():
-
-        # Parse data into dictionary of 'fields'
-        df = {}
 
-        # User Defined parsing 'flags' (usefull to have different parsing logic for different sections)
-        # and internal or intermediate variables (usefull for saving data across rows without putting in final dictionary)
-        ########################################################################################################################
-        t = -1
-        t0 = -1
-        t1 = -1
-        t2 = -1
-        in_base = False
-        in_top = False
-        in_earnings = False
-        in_deductions = False
-        baserate = ''
-        earnings_table = []
-        taxes_table = []
-        pre_table = []
-        post_table = []
-        other_table = []
-        ########################################################################################################################
-
-        lines = [line for line in paycheck_text.split('\n') if line.strip()]
-
-        # Process each row of paycheck
-        for line in lines:
-
-            line = str(line)
-
-            # User Defined Parser Logic, this will be totally dependent on the format of your paycheck pdf... good luck!
-            ####################################################################################################################
-            if in_base:
-                number = float(line.strip().replace(',', ''))
-                df['Base Rate'] = number * 80.0 if baserate == 'Hourly' else number
-                in_base = False
-
-            elif in_top:
-                row = line.split()
-                row = [row[0]] + [float(r.replace(',', '')) for r in row[1:]]
-                try:
-                    df['Total Gross'] = row[1]
-                    df['Fed Taxable Gross'] = row[2]
-                    df['OASDI Gross'] = row[3]
-                    df['MEDI Gross'] = row[4]
-                    df['Net Pay'] = row[5]
-                except:
-                    pass
-                in_top = False
-
-            elif in_earnings:
-                end_earnings = end_re.search(line)
-                # Parse tables
-                earnings = line[:t]
-                taxes = line[t:]
-                row0 = [earnings[:e+1].split('  ')[-1].strip().replace(',', '') for e in earnings_table]
-                row1 = [taxes[:e+1].split('  ')[-1].strip().replace(',', '') for e in taxes_table]
-                key0 = earnings.split('  ')[0]
-                key1 = taxes.split('  ')[0]
-
-                if end_earnings:
-                    in_earnings = False
-                    key0 = key0.replace(':', '') + ' Pay'
-                    key1 = key1.replace(':', '') + ' Tax'
-
-                if key0:
-                    df[key0] = float(row0[2]) if row0[2] else 0.0
-                if key1:
-                    df[key1] = float(row1[1]) if row1[1] else 0.0
-
-            elif in_deductions:
-                end_deductions = end_re.search(line)
-                # Parse tables
-                pre = line[:t1]
-                post = line[t1:t2]
-                other = line[t2:]
-                row0 = [pre[:e+1].split('  ')[-1].strip().replace(',', '') for e in pre_table]
-                row1 = [post[:e+1].split('  ')[-1].strip().replace(',', '') for e in post_table]
-                row2 = [other[:e+1].split('  ')[-1].strip().replace(',', '') for e in other_table]
-                key0 = pre.split('  ')[0]
-                key1 = post.split('  ')[0]
-                key2 = other.split('  ')[0]
-                if end_deductions:
-                    in_deductions = False
-                    key0 = key0.replace(':', '') + ' Before Tax'
-                    key1 = key1.replace(':', '') + ' After Tax'
-                    key2 = key2.replace(':', '') + ' Other Tax'
-
-                if key0:
-                    df[key0] = float(row0[1]) if row0[1] else 0.0
-                if key1:
-                    df[key1] = float(row1[1]) if row1[1] else 0.0
-                if key2:
-                    df[key2] = float(row2[1]) if row2[1] else 0.0
-
-            # Regular parsing
+    def __init__(self, spec=None):
+        """Compile the layout spec"""
+        self.spec = spec if spec else PAYCHECK_SPEC
+        self.sections = {}
+        for section in self.spec:
+            anchor = section['tables'][0]['anchor'] if section['kind'] == 'tables' else section['anchor']
+            self.sections[anchor] = section
+        self.anchor_re = re.compile('|'.join(re.escape(a) for a in sorted(self.sections, key=len, reverse=True)))
+
+        # The check date section separates pay periods, and with the employer (if any) identifies each record
+        dates = [x for x in self.spec if x['kind'] == 'value' and x['field'] == 'Date']
+        self.date_anchor = dates[0]['anchor'] if dates else None
+        self.key = [dates[0]['prefix'], 'Date'] if dates and 'prefix' in dates[0] else ['Date']
+
+    def __call__(self, paychecks_dict=None):
+        """
+        Parse a dictionary of paycheck texts, returns a DataFrame indexed by date with one record per (employer, check date).
+        The employer (the date's `prefix` field) is the first column, every other column is numeric. Texts are parsed in key
+        (file path) order, so the last text of a repeated (employer, check date) is the one kept.
+        """
+
+        # Parse each pay period into a dictionary of fields, periods without a check date are skipped
+        paychecks = [
+            self.parse(period)
+            for name in sorted(paychecks_dict)
+            for period in self.split(paychecks_dict[name])
+        ]
+        paychecks = [x for x in paychecks if 'Date' in x]
+
+        # Convert list of paycheck field dictionary to DataFrame, one record per (employer, check date)
+        paycheck_df = pd.DataFrame(paychecks)
+        key = [x for x in self.key if x in paycheck_df]
+        paycheck_df = paycheck_df.drop_duplicates(subset=key, keep='last')
+
+        # Up until now paychecks are not necessarilly read or parsed in chronological order so sort chronologically
+        paycheck_df = paycheck_df.sort_values(key[::-1]).set_index('Date')
+
+        # Employer first, it tells apart checks of the same date
+        employer = [x for x in key if x != 'Date']
+        return paycheck_df[employer + [x for x in paycheck_df.columns if x not in employer]]
+
+    def split(self, paycheck_text=''):
+        """
+        Split text holding several pay periods (e.g. a multi-page statement) into the text of each period, a new period starts
+        at every line containing the check date anchor. Text before the first check date belongs to the first period.
+        """
+        if self.date_anchor is None:
+            return [paycheck_text]
+
+        periods = []
+        lines = []
+        dated = False
+        for line in paycheck_text.split('\n'):
+            if self.date_anchor in line:
+                if dated:
+                    periods.append('\n'.join(lines))
+                    lines = []
+                dated = True
+            lines.append(line)
+        periods.append('\n'.join(lines))
+
+        return periods
+
+    @staticmethod
+    def number(text=''):
+        """Convert a number cell to float, blank cells are zero"""
+        text = text.strip().replace(',', '')
+        return float(text) if text else 0.0
+
+    @staticmethod
+    def table_columns(line='', section=None):
+        """
+        Find the tables of a side by side `tables` header line, returns a list of (start, end, value column end, total key)
+        tuples. Column ends are the last character of each header word (header words are separated by 2+ spaces). The value
+        column is the header word matching the table's `column`, or the word at position `index`. Raises a ValueError if
+        neither is in the header, rather than skipping every row.
+        """
+        # Each table starts at its anchor, the first at the start of the line
+        starts = [0]
+        position = line.find(section['tables'][0]['anchor'])
+        for table in section['tables'][1:]:
+            position = line.find(table['anchor'], position + 1)
+            starts.append(position)
+        ends = starts[1:] + [len(line)]
+
+        tables = []
+        for start, end, table in zip(starts, ends, section['tables']):
+            header = line[start:end]
+            words = [(m.group(), m.end() - 1) for m in re.finditer(r'\S+(?: \S+)*', header)]
+            columns = dict(words)
+            if table['column'] in columns:
+                column_end = columns[table['column']]
+            elif table.get('index', len(words)) < len(words):
+                column_end = words[table['index']][1]
             else:
+                raise ValueError('Paycheck table header has no {!r} column: {!r}'.format(table['column'], header.strip()))
+            tables.append((start, end, column_end, table['total']))
 
-                # Search for Strings
-                date_search = check_date_re.search(line)
-                baserate_search = baserate_re.search(line)
-                top_search = top_re.search(line)
-                earnings_search = earnings_re.search(line)
-                deductions_search = deductions_re.search(line)
-
-                # Set flags and parse out table positions
-                if date_search:
-                    df['Date'] = pd.to_datetime(date_search.groups()[0])
-                if baserate_search:
-                    baserate = baserate_search.groups()[0]
-                    in_base = True
-                if top_search:
-                    in_top = True
-                if earnings_search:
-                    t = line.find('Taxes')
-                    earnings = line[:t]
-                    taxes = line[t:]
-                    earnigs_enum_zip = enumerate(zip(earnings[:-2], earnings[1:-1], earnings[2:]))
-                    taxes_enum_zip = enumerate(zip(taxes[:-2], taxes[1:-1], taxes[2:]))
-                    earnings_table = [i for i, (c0, c1, c2) in earnigs_enum_zip if c0 != ' ' and c1 + c2 == '  ']
-                    taxes_table = [i for i, (c0, c1, c2) in taxes_enum_zip if c0 != ' ' and c1 + c2 == '  ']
-                    in_earnings = True
-                if deductions_search:
-                    t0 = line.find('Description')
-                    t1 = line.find('Description', t0 + 1)
-                    t2 = line.find('Description', t1 + 1)
-                    pre = line[:t1]
-                    post = line[t1:t2]
-                    other = line[t2:]
-                    pre_enum_zip = enumerate(zip(pre[:-2], pre[1:-1], pre[2:]))
-                    post_enum_zip = enumerate(zip(post[:-2], post[1:-1], post[2:]))
-                    other_enum_zip = enumerate(zip(other[:-2], other[1:-1], other[2:]))
-                    pre_table = [i for i, (c0, c1, c2) in pre_enum_zip if c0 != ' ' and c1 + c2 == '  ']
-                    post_table = [i for i, (c0, c1, c2) in post_enum_zip if c0 != ' ' and c1 + c2 == '  ']
-                    other_table = [i for i, (c0, c1, c2) in other_enum_zip if c0 != ' ' and c1 + c2 == '  ']
-
-                    in_deductions = True
-
-        # Store paycheck fields in list
-        paychecks.append(df)
-
-    # Convert list of paycheck field dictionary to DataFrame
-    paycheck_df = pd.DataFrame(paychecks).set_index('Date')
-
-    # Up until now paychecks are not necessarilly read or parsed in chronological order so sort chronologically
-    paycheck_df = paycheck_df.sort_index()
+        return tables
 
-    return paycheck_df
+    def parse(self, paycheck_text=''):
+        """Parse a single paycheck text into a dictionary of fields with a line state machine"""
+
+        df = {}
+        state = None
+        section = None
+        prefix = ''
+        tables = []
+
+        for line in paycheck_text.split('\n'):
+            if not line.strip():
+                continue
+
+            # Inside a section
+            if state == 'next':
+                number = self.number(line)
+                df[section['field']] = number * section.get('scale', {}).get(prefix, 1.0)
+                state = None
+
+            elif state == 'row':
+                row = line.split()[1:]
+                for field, value in zip(section['fields'], row):
+                    df[field] = self.number(value)
+                state = None
+
+            elif state == 'tables':
+                end_tables = section['end'] in line
+                for start, end, column_end, total in tables:
+                    cell = line[start:end]
+                    key = cell.split('  ')[0]
+                    if end_tables:
+                        key = key.replace(':', '') + ' ' + total
+                    if key:
+                        df[key] = self.number(cell[:column_end + 1].split('  ')[-1])
+                if end_tables:
+                    state = None
+
+            # Looking for section anchors
+            else:
+                for match in self.anchor_re.finditer(line):
+                    section = self.sections[match.group()]
+                    kind = section['kind']
+                    if kind == 'value':
+                        # Anchor without a value (e.g. at the end of the line), the field is missing
+                        value = line[match.end():].split()
+                        if not value:
+                            continue
+                        value = value[0]
+                        df[section['field']] = pd.to_datetime(value) if section.get('type') == 'date' else value
+                        if 'prefix' in section:
+                            df[section['prefix']] = line[:match.start()].strip()
+                    elif kind == 'next':
+                        prefix = line[:match.start()].strip()
+                        state = kind
+                    elif kind == 'row':
+                        state = kind
+                    elif kind == 'tables':
+                        tables = self.table_columns(line, section)
+                        state = kind
+                        break
+
+        return df
+
+def paycheck_parser(paychecks_dict=None, spec=None):
+    """
+    Convert dictonary of paycheck texts into a DataFrame. This fuction is called from within `read_in_paychecks()`.
+
+    The pay stub layout is described by a declarative `spec` (`pf.constants.PAYCHECK_SPEC` by default), so a different pay
+    stub layout only needs a different spec (see `PaycheckParser`), or you can always replace the whole function.
+
+    """
+    parser = PaycheckParser(spec) if spec else DEFAULT_PAYCHECK_PARSER
+    return parser(paychecks_dict)
 
-def read_in_paychecks(filepaths='', password='', parser=paycheck_parser, cache=True):
+DEFAULT_PAYCHECK_PARSER = PaycheckParser(PAYCHECK_SPEC)
+
+def pdf_page_count(filepath='', password=''):
+    """Count the pages of a PDF without extracting them"""
+    with open(filepath, 'rb') as fp:
+        document = PDFDocument(PDFParser(fp), password)
+        return sum(1 for _ in PDFPage.create_pages(document))
+
+def iter_pdf_pages(filepath='', password='', pagenos=None):
+    """
+    Extract the text of each page of a PDF lazily, yields one string per page in page order. Only the zero based page numbers
+    in `pagenos` are extracted if given. If a password is supplied encrypted PDFs *can* be read.
+    """
+
+    # Open a PDF file
+    with open(filepath, 'rb') as fp:
+
+        # Create string to put PDF
+        output = cStringIO.StringIO()
+
+        # Create a PDF resource manager object that stores shared resources.
+        manager = PDFResourceManager()
+
+        # Create a PDF converter object.
+        converter = TextConverter(manager, output, laparams=LAParams())
+
+        # Create a PDF interpreter object.
+        interpreter = PDFPageInterpreter(manager, converter)
+
+        # Process each page contained in the document, raises PDFTextExtractionNotAllowed if text can not be extracted
+        try:
+            for page in PDFPage.get_pages(fp, pagenos=set(pagenos) if pagenos else None, password=password):
+                interpreter.process_page(page)
+                # Page breaks (form feeds) would shift the columns of a table continued on the next page
+                yield output.getvalue().replace('\x0c', '')
+                output.seek(0)
+                output.truncate()
+        finally:
+            # Close up file objects
+            converter.close()
+            output.close()
+
+def pdf_pages_text(job=None):
+    """Extract the text of some pages of a PDF, `job` is a picklable (filepath, password, pagenos) tuple for a process pool"""
+    filepath, password, pagenos = job
+    return list(iter_pdf_pages(filepath, password, pagenos))
+
+def read_pdf_text(filepath='', password='', processes=None):
+    """
+    Extract the text of all pages of a PDF, returns one string. PDFs with more than `PDF_PAGES_PER_PROCESS` pages are split into
+    page ranges extracted in parallel by `processes` worker processes (all cores by default, 1 disables it). Pages are only
+    counted for files larger than `PDF_POOL_MIN_BYTES`, smaller files are extracted in this process.
+    """
+    if processes != 1 and os.path.getsize(filepath) > PDF_POOL_MIN_BYTES:
+        number_of_pages = pdf_page_count(filepath, password)
+        if number_of_pages > PDF_PAGES_PER_PROCESS:
+            jobs = [
+                (filepath, password, range(first, min(first + PDF_PAGES_PER_PROCESS, number_of_pages)))
+                for first in range(0, number_of_pages, PDF_PAGES_PER_PROCESS)
+            ]
+            pool = multiprocessing.Pool(processes)
+            try:
+                return ''.join(text for texts in pool.map(pdf_pages_text, jobs) for text in texts)
+            finally:
+                pool.close()
+                pool.join()
+    return ''.join(iter_pdf_pages(filepath, password))
+
+def read_in_paychecks(filepaths='', password='', parser=paycheck_parser, cache=True, processes=None):
     """
     Read in all the paychecks from a directory full of PDFs and return a DataFrame. If a password is supplied encrypted PDFs
     *can* be read. PDFs are converted to text lines, which are assumed to be mostly tabular and converted to lists of lists
     using multiple spaces as elimiters. Since PDFs are unstructured the parsing function will almost definetly need to be
     overriden by the user.
 
-    Note:
-    Assumes PDF file names contain date.
+    Every page of each PDF is read, so a PDF may bundle several pay periods or employers. The default parser (see
+    `PaycheckParser`) splits the text into pay periods at each check date and keeps one record per (employer, check date).
+    Pages of large PDFs are extracted in parallel with `processes` worker processes (all cores by default, 1 disables it).
+
+    The cache is reread when any PDF is newer than it.
 
     Example:
     ```
@@ -476,62 +576,20 @@ def read_in_paychecks(filepaths='', password='', parser=paycheck_parser, cache=T
     """
 
     # Get PDFs from directory and check for cached file
-    paycheckfiles = glob.glob(filepaths)
+    paycheckfiles = sorted(glob.glob(filepaths))
     paycheck_cache_file = os.path.dirname(filepaths) + '.csv'
-    cached = os.path.exists(paycheck_cache_file)
+    cached = os.path.exists(paycheck_cache_file) and all(
+        os.path.getmtime(paycheckfile) <= os.path.getmtime(paycheck_cache_file) for paycheckfile in paycheckfiles
+    )
 
     # Read in cached file if it exists
     if cache and cached:
         paycheck_df = read_date_csv_file(paycheck_cache_file)
 
     # Read paycheck data if need be (not cached or new paycheck)
-    if not cache or not cached or len(paycheckfiles) > len(paycheck_df):
-        # Read in paycheck data to dictionary
-        paycheck_dict = {}
-        for paycheckfile in paycheckfiles:
-
-            # Open a PDF file
-            fp = open(paycheckfile, 'rb')
-            # Get the date
-            date = DATE_RE.findall(paycheckfile)[0]
-
-            # Create string to put PDF
-            output = cStringIO.StringIO()
-
-            # Create a PDF parser object associated with the file object.
-            pdfparser = PDFParser(fp)
-
-            # Create a PDF document object that stores the document structure. Supply the password for initialization.
-            document = PDFDocument(pdfparser, password)
-
-            # Check if the document allows text extraction. If not, abort.
-            if not document.is_extractable:
-                raise PDFTextExtractionNotAllowed
-
-            # Create a PDF resource manager object that stores shared resources.
-            manager = PDFResourceManager()
-
-            # Create a PDF converter object.
-            converter = TextConverter(manager, output, laparams=LAParams())
-
-            # Create a PDF interpreter object.
-            interpreter = PDFPageInterpreter(manager, converter)
-
-            # Process each page contained in the document.
-            pages = list(PDFPage.create_pages(document))
-            interpreter.process_page(pages[0])
-
-            # Get text
-            text = output.getvalue()
-
-            # Close up file objects
-            pdfparser.close()
-            fp.close()
-            converter.close()
-            output.close()
-
-            # Add to dictionary
-            paycheck_dict[date] = text
+    else:
+        # Read in paycheck text of every file to dictionary
+        paycheck_dict = {paycheckfile: read_pdf_text(paycheckfile, password, processes) for paycheckfile in paycheckfiles}
 
         # Parse paycheck data with user defined function
         paycheck_df = parser(paycheck_dict)
@@ -543,3 +601,100 @@ def read_in_paychecks(filepaths='', password='', parser=paycheck_parser, cache=T
             paycheck_df.to_csv(paycheck_cache_file)
 
     return paycheck_df
+
+################################################################################################################################
+# Economic Data Functions
+################################################################################################################################
+def fred_columns(header=None):
+    """
+    Dedupe FRED column names hierarchically. The FRED category hierarchy was collapsed to the last level, so the same name can
+    appear under different parents (e.g. `Housing`), each name becomes a (name, instance) tuple instead.
+    """
+    counts = {}
+    columns = []
+    for name in header:
+        columns.append((name, counts.get(name, 0)))
+        counts[name] = counts.get(name, 0) + 1
+    return columns
+
+def read_in_fred(filepath='', columns=None, cache=True):
+    """
+    Read in the average personal income and expense FRED data file (`notebooks/average_personal_income_and_expense.csv`) as a
+    float32 DataFrame with (name, instance) MultiIndex columns (see `fred_columns()`).
+
+    The first read writes a column-major float32 binary cache (`.f32`) and a metadata file (`.json`) next to the `csv`, later
+    reads memory map the cache. Selecting `columns` (names for every instance, or (name, instance) tuples) then only touches
+    those columns. The cache is rebuilt whenever the size or modification time of the `csv` changes.
+
+    Example:
+    ```
+    fred = read_in_fred('/path/to/average_personal_income_and_expense.csv', columns=['Housing', 'Personal Income'])
+    ```
+    """
+
+    # Cache files and source file stamp
+    cache_file = os.path.splitext(filepath)[0] + '.f32'
+    meta_file = os.path.splitext(filepath)[0] + '.json'
+    stamp = [os.path.getsize(filepath), os.path.getmtime(filepath)]
+
+    # Read cache metadata if it exists
+    meta = None
+    if cache and os.path.exists(meta_file) and os.path.exists(cache_file):
+        with open(meta_file, 'r') as f:
+            meta = json.load(f)
+
+    # Parse csv if there is no valid cache
+    if meta is None or meta['source'] != stamp:
+        with open(filepath, 'r') as f:
+            header = next(csv.reader(f))
+        all_columns = fred_columns(header[1:])
+        data = pd.read_csv(
+            filepath,
+            header=None,
+            skiprows=1,
+            index_col=0,
+            parse_dates=True,
+            dtype={i: np.float32 for i in range(1, len(header))}
+        )
+        dates = data.index
+
+        # Write column-major binary cache, so each column is contiguous on disk
+        if cache:
+            values = np.memmap(cache_file, dtype=np.float32, mode='w+', shape=(len(all_columns), len(dates)))
+            values[:] = data.values.T
+            values.flush()
+            del values
+            meta = {
+                'source': stamp,
+                'dates': [str(d.date()) for d in dates],
+                'columns': all_columns,
+                'shape': [len(all_columns), len(dates)]
+            }
+            with open(meta_file, 'w') as f:
+                json.dump(meta, f)
+        else:
+            values = data.values.T
+    else:
+        all_columns = [tuple(c) for c in meta['columns']]
+        dates = pd.to_datetime(meta['dates'])
+
+    # Memory map cache
+    if cache:
+        values = np.memmap(cache_file, dtype=np.float32, mode='r', shape=tuple(meta['shape']))
+
+    # Select columns
+    all_columns = [tuple(c) for c in all_columns]
+    if columns is None:
+        positions = range(len(all_columns))
+    else:
+        names = {c for c in columns if not isinstance(c, tuple)}
+        instances = {c for c in columns if isinstance(c, tuple)}
+        positions = [i for i, c in enumerate(all_columns) if c[0] in names or c in instances]
+
+    fred = pd.DataFrame(
+        np.asarray(values[positions]).T,
+        index=pd.DatetimeIndex(dates, name='Date'),
+        columns=pd.MultiIndex.from_tuples([all_columns[i] for i in positions])
+    )
+
+    return fred
@@ -0,0 +1,196 @@
+"""
+matching.py
+
+Pool matching functions, searching many members for groups of compatible co-investors that can reach a housing purchase.
+
+project    : pf
+version    : 0.0.0
+status     : development
+modifydate :
+createdate :
+website    : https://github.com/tmthydvnprt/pf
+author     : tmthydvnprt
+email      : tim@tmthydvnprt.com
+maintainer : tmthydvnprt
+license    : MIT
+copyright  : Copyright 2016, tmthydvnprt
+credits    :
+
+"""
+from __future__ import division
+
+import heapq
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from pf.constants import DAYS_IN_YEAR
+
+################################################################################################################################
+# Member Features
+################################################################################################################################
+def member_features(stacked_summary=None):
+    """
+    Build the matching features of each member from the latest row of `pf.group.stack_summaries()` output, returns a DataFrame
+    indexed by member.
+
+    Savings [$/Mo] = (Realized Income + Expense) / 12
+    Savings Rate [%] = (Realized Income + Expense) / Realized Income
+    Debt Ratio [%] = -Debts / Assets
+    Debt to Income [%] = -Debts / Realized Income
+    """
+
+    latest = stacked_summary.groupby(level='Member').last()
+
+    features = pd.DataFrame({
+        'Date': stacked_summary.reset_index(level='Date')['Date'].groupby(level='Member').max(),
+        'Assets': latest['Assets'],
+        'Debts': latest['Debts'],
+        'Net': latest['Net'],
+        'Realized Income': latest['Realized Income'],
+        'Savings [$/Mo]': (latest['Realized Income'] + latest['Expense']) / 12.0,
+        'Savings Rate [%]': 100.0 * (latest['Realized Income'] + latest['Expense']) / latest['Realized Income'],
+        'Debt Ratio [%]': 100.0 * -latest['Debts'] / latest['Assets'],
+        'Debt to Income [%]': 100.0 * -latest['Debts'] / latest['Realized Income']
+    })
+
+    return features.replace([-np.inf, np.inf], np.nan)
+
+################################################################################################################################
+# Member Index
+################################################################################################################################
+class MemberIndex(object):
+    """
+    Index of member features for finding compatible co-investors.
+
+    Members are indexed by a KD-tree on their standardized `dimensions` (savings rate, net worth and debt ratio by default) to
+    find similar members, and groups reaching a target are searched with branch and bound over members sorted by projected
+    savings.
+
+    Example:
+    ```
+    index = MemberIndex(member_features(stack_summaries(summaries)))
+    groups = index.find_groups(target=100000.0, date='2020-01-01', k=3)
+    ```
+    """
+
+    def __init__(self, features=None, dimensions=None):
+        """Build the KD-tree of member features"""
+        self.dimensions = dimensions if dimensions else ['Savings Rate [%]', 'Net', 'Debt Ratio [%]']
+        self.features = features.dropna(subset=self.dimensions + ['Savings [$/Mo]'])
+        self.members = self.features.index.values
+
+        # Standardize dimensions so each has equal weight in distance
+        values = self.features[self.dimensions].values
+        self.mean = values.mean(axis=0)
+        self.std = values.std(axis=0)
+        self.std[self.std == 0.0] = 1.0
+        self.tree = cKDTree((values - self.mean) / self.std)
+
+    def __len__(self):
+        """Number of members in index"""
+        return len(self.members)
+
+    def nearest(self, member, n=10):
+        """Find the `n` members most similar to `member` (excluding itself), returns a list of members"""
+        point = (self.features.loc[member, self.dimensions].values - self.mean) / self.std
+        _, positions = self.tree.query(point, k=min(n + 1, len(self.members)))
+        return [m for m in self.members[np.atleast_1d(positions)] if m != member][:n]
+
+    def projected_savings(self, date=None):
+        """Project each member's net worth forward to `date` with their current monthly savings"""
+        months = 12.0 * (pd.Timestamp(date) - self.features['Date']).dt.days / DAYS_IN_YEAR
+        return self.features['Net'] + self.features['Savings [$/Mo]'] * months.clip(lower=0.0)
+
+    def find_groups(
+            self,
+            target=100000.0,
+            date=None,
+            k=2,
+            anchor=None,
+            neighbors=50,
+            max_debt_ratio=np.inf,
+            max_debt_to_income=np.inf,
+            max_groups=10
+        ):
+        """
+        Find groups of `k` members whose pooled projected savings reach `target` by `date`, returns a DataFrame of candidate
+        groups ranked by feasibility (pooled savings over target).
+
+        If an `anchor` member is given, groups always contain the anchor and are searched among its `neighbors` most similar
+        members. Groups whose pooled debt ratio or pooled debt to income exceed the maximums are discarded.
+
+        Members are sorted by projected savings, so a branch is pruned as soon as its savings plus the next best remaining
+        members cannot reach the target, or cannot beat the worst of the best `max_groups` groups found so far.
+        """
+
+        # Candidate members, sorted by projected savings, and the anchor's share of the group
+        projected = self.projected_savings(date)
+        if anchor is not None:
+            candidates = projected[self.nearest(anchor, neighbors)]
+            base = [anchor]
+            k = k - 1
+        else:
+            candidates = projected
+            base = []
+        base_savings = projected[base].sum()
+        base_assets, base_debts, base_income = self.features.loc[base, ['Assets', 'Debts', 'Realized Income']].sum()
+
+        candidates = candidates.sort_values(ascending=False)
+        savings = candidates.values
+        members = candidates.index.values
+        assets = self.features.loc[members, 'Assets'].values
+        debts = self.features.loc[members, 'Debts'].values
+        income = self.features.loc[members, 'Realized Income'].values
+
+        # Sum of the `r` best members from each position on is the upper bound of a branch (members are sorted)
+        cumulative = np.concatenate([[0.0], np.cumsum(savings)])
+        def upper_bound(i, r):
+            """Best possible savings of `r` more members starting at position `i`"""
+            return cumulative[min(i + r, len(savings))] - cumulative[i]
+
+        # Branch and bound search, keeping a min heap of the best groups
+        best = []
+        stack = [(0, (), base_savings)]
+        while stack:
+            start, group, total = stack.pop()
+            remaining = k - len(group)
+
+            # Complete group
+            if remaining == 0:
+                idx = list(group)
+                debt_ratio = 100.0 * -(base_debts + debts[idx].sum()) / (base_assets + assets[idx].sum())
+                debt_to_income = 100.0 * -(base_debts + debts[idx].sum()) / (base_income + income[idx].sum())
+                if debt_ratio <= max_debt_ratio and debt_to_income <= max_debt_to_income:
+                    heapq.heappush(best, (total, group))
+                    if len(best) > max_groups:
+                        heapq.heappop(best)
+                continue
+
+            # Branches get worse further down the sorted members, so stop at the first that can not make it
+            branches = []
+            for i in range(start, len(savings) - remaining + 1):
+                bound = total + upper_bound(i, remaining)
+                if bound < target or (len(best) == max_groups and bound <= best[0][0]):
+                    break
+                branches.append((i + 1, group + (i,), total + savings[i]))
+
+            # Search the best branches first
+            stack.extend(reversed(branches))
+
+        # Rank groups
+        groups = []
+        for total, group in sorted(best, reverse=True):
+            group_members = base + members[list(group)].tolist()
+            pooled_debts = self.features.loc[group_members, 'Debts'].sum()
+            groups.append({
+                'Members': tuple(group_members),
+                'Pooled Savings [$]': total,
+                'Surplus [$]': total - target,
+                'Feasibility [%]': 100.0 * total / target,
+                'Debt Ratio [%]': 100.0 * -pooled_debts / self.features.loc[group_members, 'Assets'].sum(),
+                'Debt to Income [%]': 100.0 * -pooled_debts / self.features.loc[group_members, 'Realized Income'].sum()
+            })
+
+        columns = ['Members', 'Pooled Savings [$]', 'Surplus [$]', 'Feasibility [%]', 'Debt Ratio [%]', 'Debt to Income [%]']
+        return pd.DataFrame(groups, columns=columns)
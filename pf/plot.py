@@ -28,26 +28,93 @@ import matplotlib.patches as mpatches
 
 from pf.util import f2as
 
+################################################################################################################################
+# Plotting Data Helpers
+################################################################################################################################
+def pixel_width(figsize=(16.0, 8.0)):
+    """Width of a figure in pixels, the most points a plot can show"""
+    return int(figsize[0] * matplotlib.rcParams['figure.dpi'])
+
+def decimate(data, width=1600):
+    """
+    Downsample time series `data` to about `width` rows while preserving the min and max of each column.
+
+    Rows are split into `width / 2` equal buckets and the rows holding the min and max of each column are kept from every
+    bucket, along with the first and last row. Peaks and troughs survive decimation, unlike striding or averaging.
+    """
+
+    # Nothing to do if data already fits
+    if len(data.index) <= width:
+        return data
+
+    # Assign rows to buckets and find min/max row of each column in each bucket
+    buckets = np.arange(len(data.index)) * (width // 2) // len(data.index)
+    values = data.reset_index(drop=True)
+    grouped = values.groupby(buckets)
+    keep = np.concatenate([grouped.idxmin().values.ravel(), grouped.idxmax().values.ravel(), [0, len(data.index) - 1]])
+
+    # Rows of all-NaN buckets come back as NaN
+    keep = np.unique(keep[~np.isnan(keep)].astype(int))
+
+    return data.iloc[keep]
+
+def smooth_timeseries(data, width=1600, order=2, offset=pd.Timedelta('-30 days')):
+    """
+    Smooth time series `data` onto `width` evenly spaced timestamps with pchip interpolation and shift by `offset`.
+
+    This should be applied after `decimate()`, so the interpolation only ever sees and produces about as many points as pixels.
+    """
+
+    # Evenly spaced grid across the data
+    grid = pd.DatetimeIndex(np.linspace(data.index[0].value, data.index[-1].value, width).astype(np.int64))
+
+    # Interpolate onto the grid
+    smoothdata = data \
+        .reindex(data.index.union(grid)) \
+        .interpolate(method='pchip', order=order) \
+        .reindex(grid)
+    smoothdata.index = smoothdata.index + offset
+
+    return smoothdata
+
 ################################################################################################################################
 # Plotting functions
 ################################################################################################################################
-def timeseries(data, columns=None, title='', stacked=False, smooth=2, datapoints=True, close=True, current_bar=True):
-    """Make nice plot for time series"""
+def timeseries(
+        data,
+        columns=None,
+        title='',
+        stacked=False,
+        smooth=2,
+        datapoints=True,
+        close=True,
+        current_bar=True,
+        figsize=(16.0, 8.0),
+        width=None
+    ):
+    """
+    Make nice plot for time series.
+
+    Data is decimated (min/max preserving) to `width` points, defaulting to the pixel width of `figsize`, before any smoothing,
+    so long or high frequency histories plot quickly.
+    """
 
     # User columns or use all
     columns = columns if columns else data.columns.tolist()
+    width = width if width else pixel_width(figsize)
+
+    # Decimate Data
+    plotdata = decimate(data[columns], width)
 
     # Smooth Data
     if smooth > 0:
-        smoothdata = data[columns] \
-            .resample('D', loffset=pd.Timedelta('-30 days')) \
-            .interpolate(method='pchip', order=smooth)
+        smoothdata = smooth_timeseries(plotdata, width, order=smooth)
     else:
-        smoothdata = data[columns].copy()
+        smoothdata = plotdata.copy()
     # Plot
     if stacked:
         smoothdata[smoothdata < 0] = 0
-    ax = smoothdata.plot(kind='area', stacked=stacked, figsize=(16.0, 8.0))
+    ax = smoothdata.plot(kind='area', stacked=stacked, figsize=figsize)
 
     # Set axis limits
     matplotlib.pyplot.xlim([data.index[0] - pd.DateOffset(months=1), data.index[-1] + pd.DateOffset(months=1)])
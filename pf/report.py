@@ -17,3 +17,233 @@ copyright  : Copyright 2016, tmthydvnprt
 credits    :
 
 """
+from __future__ import division
+
+import os
+import json
+import datetime
+import multiprocessing
+from collections import OrderedDict
+
+import pf.plot
+from pf.util import f2as, checksum_frame
+from pf.accounting import (
+    calc_balance, balance_sheet, calc_income, income_statement, calc_cashflow, cashflow_statement,
+    calculate_net_worth, summarize_accounts
+)
+
+################################################################################################################################
+# Report Constants
+################################################################################################################################
+REPORT_MANIFEST = 'manifest.json'
+REPORT_INDEX = 'report.html'
+
+################################################################################################################################
+# Report Sections
+################################################################################################################################
+def compute_sections(
+        accounts=None,
+        transactions=None,
+        paychecks=None,
+        category_dict=None,
+        tax_type=None,
+        period=None
+    ):
+    """
+    Compute every statement and chart of a report once, returns an ordered dictionary of sections.
+
+    `category_dict` is a dictionary holding the category definitions for each statement, with the keys `balance`, `income` and
+    `cashflow` (see `calc_balance()`, `calc_income()` and `calc_cashflow()` for their form). Each section is a tuple of
+    (kind, data, options) where kind is either `table` (rendered as html) or `chart` (rendered with `pf.plot.timeseries()`).
+    Statements are for the `period` year, the current year by default.
+
+    Example:
+    ```
+    sections = compute_sections(accounts, transactions, paychecks, category_dict=categories, tax_type=tax_type, period=2016)
+    ```
+    """
+
+    period = period if period is not None else datetime.datetime.now().year
+
+    # Calculate daily statement data
+    balance = calc_balance(accounts, category_dict=category_dict['balance'])
+    income = calc_income(paychecks, transactions, category_dict=category_dict['income'], tax_type=tax_type)
+    cashflow = calc_cashflow(transactions, category_dict=category_dict['cashflow'], tax_type=tax_type)
+    net_worth = calculate_net_worth(accounts)
+
+    # Monthly totals of each statement section for charts
+    monthly_balance = balance.groupby(level=0, axis=1).sum()
+    monthly_income = income.resample('M').sum().groupby(level=0, axis=1).sum()
+    monthly_cashflow = cashflow.resample('M').sum().groupby(level=0, axis=1).sum()
+    for frame in [monthly_balance, monthly_income, monthly_cashflow]:
+        frame.index.name = 'Date'
+
+    sections = OrderedDict([
+        ('Balance Sheet', ('table', balance_sheet(balance, period=period), {})),
+        ('Income Statement', ('table', income_statement(income, period=period), {})),
+        ('Cashflow Statement', ('table', cashflow_statement(cashflow, period=period), {})),
+        ('Account Summary', ('table', summarize_accounts(accounts), {})),
+        ('Net Worth', ('chart', net_worth[['Assets', 'Debts', 'Net']], {'title': 'Net Worth'})),
+        ('Balance', ('chart', monthly_balance, {'title': 'Balance'})),
+        ('Income', ('chart', monthly_income, {'title': 'Income'})),
+        ('Cashflow', ('chart', monthly_cashflow, {'title': 'Cashflow'}))
+    ])
+
+    return sections
+
+def section_hash(kind, data, options):
+    """Hash the inputs of a section, an unchanged hash means the section does not need to be rendered again"""
+    return '{}-{}-{}'.format(kind, checksum_frame(data), json.dumps(options, sort_keys=True))
+
+def render_section(job):
+    """
+    Render a single section to a file, returns the section name and file path. This is the function run by the process pool,
+    so `job` is a single picklable tuple of (name, kind, data, options, filepath).
+    """
+
+    name, kind, data, options, filepath = job
+
+    if kind == 'table':
+        with open(filepath, 'w') as f:
+            f.write(f2as(data).to_html())
+    else:
+        png = pf.plot.timeseries(data, close=True, **options)
+        with open(filepath, 'wb') as f:
+            f.write(png.getvalue())
+        png.close()
+
+    return (name, filepath)
+
+################################################################################################################################
+# Report Rendering
+################################################################################################################################
+def read_manifest(output_dir=''):
+    """Read the section hashes of the last rendered report in `output_dir`, returns an empty dictionary if there is none"""
+    manifest_file = os.path.join(output_dir, REPORT_MANIFEST)
+    if os.path.exists(manifest_file):
+        with open(manifest_file, 'r') as f:
+            return json.load(f)
+    return {}
+
+def write_manifest(manifest, output_dir=''):
+    """Write the section hashes of a rendered report to `output_dir`"""
+    with open(os.path.join(output_dir, REPORT_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
+
+def section_filepath(name, kind, output_dir=''):
+    """File path of a rendered section"""
+    extension = 'html' if kind == 'table' else 'png'
+    return os.path.join(output_dir, '{}.{}'.format(name.lower().replace(' ', '_'), extension))
+
+def write_index(sections, output_dir=''):
+    """Combine the rendered sections of a report into a single html page"""
+    parts = []
+    for name, (kind, _, _) in sections.items():
+        filepath = section_filepath(name, kind, output_dir)
+        parts.append('<h2>{}</h2>'.format(name))
+        if kind == 'table':
+            with open(filepath, 'r') as f:
+                parts.append(f.read())
+        else:
+            parts.append('<img src="{}"/>'.format(os.path.basename(filepath)))
+
+    index_file = os.path.join(output_dir, REPORT_INDEX)
+    with open(index_file, 'w') as f:
+        f.write('<html>\n<body>\n{}\n</body>\n</html>\n'.format('\n'.join(parts)))
+
+    return index_file
+
+def render_reports(reports, processes=None, force=False):
+    """
+    Render many reports in one process pool, returns a dictionary of report index file paths.
+
+    `reports` is a dictionary of output directories and their sections from `compute_sections()`. The sections of all reports
+    are independent, so they are rendered concurrently. Sections whose inputs hash the same as the last render (stored in each
+    directory's manifest) are skipped, unless `force` is set. Setting `processes=1` renders serially in this process.
+    """
+
+    # Collect the sections that need to be rendered
+    jobs = []
+    manifests = {}
+    for output_dir, sections in reports.items():
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        old_manifest = read_manifest(output_dir)
+        manifests[output_dir] = {}
+        for name, (kind, data, options) in sections.items():
+            filepath = section_filepath(name, kind, output_dir)
+            manifests[output_dir][name] = section_hash(kind, data, options)
+            if force or not os.path.exists(filepath) or old_manifest.get(name) != manifests[output_dir][name]:
+                jobs.append((name, kind, data, options, filepath))
+
+    # Render sections
+    if jobs:
+        if processes == 1:
+            _ = [render_section(job) for job in jobs]
+        else:
+            pool = multiprocessing.Pool(processes)
+            try:
+                pool.map(render_section, jobs)
+            finally:
+                pool.close()
+                pool.join()
+
+    # Update manifests and write each report
+    report_files = {}
+    for output_dir, sections in reports.items():
+        write_manifest(manifests[output_dir], output_dir)
+        report_files[output_dir] = write_index(sections, output_dir)
+
+    return report_files
+
+def build_report(
+        accounts=None,
+        transactions=None,
+        paychecks=None,
+        category_dict=None,
+        tax_type=None,
+        period=None,
+        output_dir='',
+        processes=None,
+        force=False
+    ):
+    """
+    Compute and render a complete report (statements as html and charts as png) to `output_dir`, returns the report file path.
+
+    Example:
+    ```
+    report_file = build_report(
+        accounts, transactions, paychecks,
+        category_dict={'balance': balance_categories, 'income': income_categories, 'cashflow': cashflow_categories},
+        tax_type=tax_type,
+        period=2016,
+        output_dir='/path/to/report'
+    )
+    ```
+    """
+    sections = compute_sections(accounts, transactions, paychecks, category_dict, tax_type, period)
+    return render_reports({output_dir: sections}, processes=processes, force=force)[output_dir]
+
+def build_group_reports(
+        members=None,
+        category_dict=None,
+        tax_type=None,
+        period=None,
+        output_dir='',
+        processes=None,
+        force=False
+    ):
+    """
+    Compute and render a report for every member of a pooled group, returns a dictionary of member report file paths.
+
+    `members` is a dictionary of member names and their (accounts, transactions, paychecks) tuple. Each member's report is
+    written to its own subdirectory of `output_dir` and all members' sections share one process pool.
+    """
+    period = period if period is not None else datetime.datetime.now().year
+    reports = OrderedDict()
+    for member, (accounts, transactions, paychecks) in members.items():
+        member_dir = os.path.join(output_dir, str(member))
+        reports[member_dir] = compute_sections(accounts, transactions, paychecks, category_dict, tax_type, period)
+
+    report_files = render_reports(reports, processes=processes, force=force)
+    return {member: report_files[os.path.join(output_dir, str(member))] for member in members}
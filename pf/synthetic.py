@@ -0,0 +1,655 @@
+"""
+synthetic.py
+
+Synthetic personal finance data for examples, testing and benchmarking at scale.
+
+project    : pf
+version    : 0.0.0
+status     : development
+modifydate :
+createdate :
+website    : https://github.com/tmthydvnprt/pf
+author     : tmthydvnprt
+email      : tim@tmthydvnprt.com
+maintainer : tmthydvnprt
+license    : MIT
+copyright  : Copyright 2016, tmthydvnprt
+credits    :
+
+"""
+from __future__ import division
+
+import os
+import numpy as np
+import pandas as pd
+
+from pf.io import read_in_fred
+
+################################################################################################################################
+# Synthetic Data Constants
+################################################################################################################################
+# Mint style transaction categories: (Category, Transaction Type, Mean Amount, Std Dev Amount, Relative Frequency)
+TRANSACTION_CATEGORIES = [
+    ('Paycheck', 'credit', 2000.0, 200.0, 2.0),
+    ('Interest Income', 'credit', 5.0, 3.0, 1.0),
+    ('Dividend & Cap Gains', 'credit', 50.0, 40.0, 1.0),
+    ('Rent', 'debit', 1200.0, 50.0, 1.0),
+    ('Utilities', 'debit', 80.0, 30.0, 2.0),
+    ('Groceries', 'debit', 60.0, 30.0, 10.0),
+    ('Restaurants', 'debit', 25.0, 15.0, 12.0),
+    ('Gas & Fuel', 'debit', 35.0, 10.0, 5.0),
+    ('Shopping', 'debit', 45.0, 40.0, 6.0),
+    ('Entertainment', 'debit', 30.0, 25.0, 4.0),
+    ('Doctor', 'debit', 40.0, 30.0, 1.0),
+    ('Loan Payment', 'debit', 300.0, 20.0, 1.0),
+    ('Buy', 'debit', 500.0, 200.0, 1.0),
+]
+
+# Transaction accounts: (Account Name, Tax Type)
+TRANSACTION_ACCOUNTS = [
+    ('Checking', 'realized'),
+    ('Savings', 'realized'),
+    ('Credit Card', 'realized'),
+    ('Brokerage', 'realized'),
+    ('401k', 'unrealized'),
+]
+
+# Transaction labels
+TRANSACTION_LABELS = ['Reimbursable', 'Tax Related', 'Vacation']
+
+# Mint `csv` export columns
+RAW_TRANSACTION_COLUMNS = [
+    'Description', 'Original Description', 'Amount', 'Transaction Type', 'Category', 'Account Name', 'Labels', 'Notes'
+]
+
+# Monthly accounts: (Type, Account, Initial Balance, Mean Monthly Log Change, Std Dev Monthly Log Change)
+ACCOUNTS = [
+    ('Cash', 'Checking', 3000.0, 0.002, 0.10),
+    ('Cash', 'Savings', 10000.0, 0.010, 0.02),
+    ('Credit', 'Credit Card', -800.0, 0.000, 0.20),
+    ('Investment', 'Brokerage', 20000.0, 0.006, 0.04),
+    ('Investment', '401k', 30000.0, 0.008, 0.04),
+    ('Loan', 'Student Loan', -25000.0, -0.010, 0.002),
+    ('Property', 'Car', 15000.0, -0.008, 0.002),
+]
+
+# FRED column (first instance, see `pf.io.fred_columns()`) used as the monthly per capita prior of each transaction category,
+# categories not listed keep their constant mean amount
+FRED_PRIORS = {
+    'Paycheck': 'Personal Income',
+    'Interest Income': 'Personal Interest Income',
+    'Dividend & Cap Gains': 'Personal Dividend Income',
+    'Rent': 'Housing',
+    'Utilities': 'Household utilities and fuels',
+    'Groceries': 'Food and beverages purchased for off-premises consumption',
+    'Restaurants': 'Food services',
+    'Gas & Fuel': 'Gasoline and other energy goods',
+    'Shopping': 'Clothing and footwear',
+    'Entertainment': 'Recreation services',
+    'Doctor': 'Physician services'
+}
+
+# Log standard deviation of the income/spending level of users around the population average
+USER_SIGMA = 0.5
+
+# Seed offsets of the independent random streams of each kind of data
+SEED_STREAMS = {'users': 0, 'transactions': 1, 'accounts': 2, 'paychecks': 3}
+
+################################################################################################################################
+# Category Dictionaries
+################################################################################################################################
+def generate_categories():
+    """
+    Generate category dictionaries and tax types matching the synthetic data, returns a dictionary with `balance`, `income`,
+    `cashflow` and `tax_type` keys (see `pf.accounting.calc_balance()`, `calc_income()` and `calc_cashflow()`).
+    """
+
+    tax_type = {
+        'realized': [name for name, tax in TRANSACTION_ACCOUNTS if tax == 'realized'],
+        'unrealized': [name for name, tax in TRANSACTION_ACCOUNTS if tax == 'unrealized']
+    }
+
+    balance = {
+        'Assets': {
+            'Current': {'Cash & Cash Equivalents': ['Cash']},
+            'Long Term': {'Investments': ['Investment'], 'Property': ['Property']}
+        },
+        'Liabilities': {
+            'Current': {'Credit Card': ['Credit']},
+            'Long Term': {'Loans': ['Loan']}
+        }
+    }
+
+    income = {
+        'Revenue': {
+            'Operating': {'Technical Services': {'source': 'paycheck', 'categories': {'Total Gross'}}},
+            'Non-Operating': {
+                'Interest Income': {'categories': {'Interest Income'}},
+                'Dividend & Capital Gains': {'categories': {'Dividend & Cap Gains'}}
+            }
+        },
+        'Expenses': {
+            'Operating': {
+                'Housing': {'categories': {'Rent', 'Utilities'}},
+                'Food': {'categories': {'Groceries', 'Restaurants'}},
+                'Transportation': {'categories': {'Gas & Fuel'}},
+                'Medical': {'categories': {'Doctor'}}
+            },
+            'Non-Operating': {'Discretionary': {'categories': {'Shopping', 'Entertainment'}}}
+        },
+        'Taxes': {
+            'Operating': {
+                'Federal': {'source': 'paycheck', 'categories': {'Federal Income Tax', 'Social Security', 'Medicare'}},
+                'State': {'source': 'paycheck', 'categories': {'State Income Tax'}}
+            }
+        }
+    }
+
+    cashflow = {
+        'Inflow': {
+            'Operating': {'Technical Services': {'categories': {'Paycheck'}}},
+            'Non-Operating': {
+                'Interest Income': {'categories': {'Interest Income'}},
+                'Dividend & Capital Gains': {'categories': {'Dividend & Cap Gains'}}
+            }
+        },
+        'Outflow': {
+            'Operating': {
+                'Rent': {'categories': {'Rent', 'Utilities'}},
+                'Food': {'categories': {'Groceries', 'Restaurants'}},
+                'Transportation': {'categories': {'Gas & Fuel'}},
+                'Medical': {'categories': {'Doctor'}},
+                'Loan Payments': {'categories': {'Loan Payment'}}
+            },
+            'Non-Operating': {
+                'Discretionary': {'categories': {'Shopping', 'Entertainment'}},
+                'Purchased Investments': {'categories': {'Buy'}}
+            }
+        }
+    }
+
+    return {'balance': balance, 'income': income, 'cashflow': cashflow, 'tax_type': tax_type}
+
+################################################################################################################################
+# Transactions
+################################################################################################################################
+def transaction_columns(random=None, picks=None, amounts=None):
+    """
+    Build the raw Mint columns of transactions from their category positions in `TRANSACTION_CATEGORIES` and amounts, drawing
+    accounts, labels (about 1 in 20 transactions is labeled) and descriptions from the `random` state. Returns a dictionary.
+    """
+    number_of_transactions = len(picks)
+    categories, types, _, _, _ = zip(*TRANSACTION_CATEGORIES)
+
+    # Accounts and labels
+    account_names = np.array([name for name, _ in TRANSACTION_ACCOUNTS])
+    accounts = account_names[random.choice(len(account_names), size=number_of_transactions, p=[0.5, 0.1, 0.3, 0.05, 0.05])]
+    label_choices = np.array([''] * 19 + TRANSACTION_LABELS, dtype=object)
+    labels = label_choices[random.randint(0, len(label_choices), number_of_transactions)]
+
+    # Descriptions
+    category_names = np.array(categories, dtype=object)[picks]
+    descriptions = category_names + ' ' + random.randint(1, 1000, number_of_transactions).astype(str).astype(object)
+
+    return {
+        'Description': descriptions,
+        'Original Description': descriptions,
+        'Amount': amounts,
+        'Transaction Type': np.array(types, dtype=object)[picks],
+        'Category': category_names,
+        'Account Name': accounts,
+        'Labels': labels,
+        'Notes': ''
+    }
+
+def generate_transactions(number_of_transactions=1000, start='2014-01-01', end='2016-12-31', raw=False, seed=None):
+    """
+    Generate Mint style transactions, returns a DataFrame.
+
+    If `raw` is set the DataFrame is in the Mint `csv` export layout read by `pf.io.read_in_transactions()` (positive amounts
+    with a `Transaction Type`, label strings and notes), otherwise it is in the layout returned by `read_in_transactions()`
+    (signed amounts and label sets). Like Mint exports, transactions are sorted newest first.
+    """
+
+    random = np.random.RandomState(seed)
+
+    # Pick categories by relative frequency
+    categories, types, means, stds, freqs = zip(*TRANSACTION_CATEGORIES)
+    freqs = np.array(freqs) / np.sum(freqs)
+    picks = random.choice(len(categories), size=number_of_transactions, p=freqs)
+
+    # Random dates, newest first
+    start = pd.Timestamp(start)
+    days = (pd.Timestamp(end) - start).days + 1
+    dates = start + pd.to_timedelta(np.sort(random.randint(0, days, number_of_transactions))[::-1], unit='D')
+
+    # Amounts, always at least a penny
+    amounts = np.abs(np.array(means)[picks] + np.array(stds)[picks] * random.randn(number_of_transactions))
+    amounts = np.maximum(amounts, 0.01).round(2)
+
+    # Build DataFrame
+    transactions = pd.DataFrame(
+        transaction_columns(random, picks, amounts),
+        index=pd.DatetimeIndex(dates, name='Date')
+    )
+    transaction_types = transactions['Transaction Type'].values
+    labels = transactions['Labels'].values
+
+    if raw:
+        return transactions[RAW_TRANSACTION_COLUMNS]
+
+    # Same processing as read_in_transactions()
+    transactions.loc[transaction_types == 'debit', 'Amount'] *= -1.0
+    transactions['Labels'] = [{label} if label else set() for label in labels]
+    columns = ['Description', 'Original Description', 'Amount', 'Category', 'Account Name', 'Labels']
+
+    return transactions[columns]
+
+################################################################################################################################
+# Accounts
+################################################################################################################################
+def generate_accounts(number_of_months=36, start='2014-01-31', seed=None):
+    """
+    Generate monthly account balances as a random walk of log changes, returns a tuple of DataFrames in the same layout as
+    `pf.io.read_in_accounts()`: (accounts, limits, loan, incometaxes, salestax).
+    """
+
+    random = np.random.RandomState(seed)
+    index = pd.DatetimeIndex(pd.date_range(start, periods=number_of_months, freq='M'), name='Date')
+
+    # Random walk of log changes from the initial balance
+    _, _, initial, mean, std = [np.array(x) for x in zip(*ACCOUNTS)]
+    log_change = mean + std * random.randn(number_of_months, len(ACCOUNTS))
+    log_change[0] = 0.0
+    balances = (initial * np.exp(np.cumsum(log_change, axis=0))).round(2)
+    accounts = pd.DataFrame(
+        balances,
+        index=index,
+        columns=pd.MultiIndex.from_tuples([(t, a) for t, a, _, _, _ in ACCOUNTS])
+    )
+
+    # Credit and loan limits
+    limits = pd.DataFrame(
+        {('Credit', 'Credit Card'): -5000.0, ('Loan', 'Student Loan'): -30000.0},
+        index=index
+    )
+
+    # Employer retirement loan paid down monthly
+    loan = pd.DataFrame({('Loan', '401(k) Loan'): np.linspace(-5000.0, 0.0, number_of_months)}, index=index)
+
+    # Income tax and sales tax rates
+    incometaxes = pd.DataFrame({('Income Tax', 'Federal'): 0.15, ('Income Tax', 'State'): 0.05}, index=index)
+    salestax = pd.DataFrame({('Sales Tax', 'Location 1'): 0.0775}, index=index)
+
+    return (accounts, limits, loan, incometaxes, salestax)
+
+################################################################################################################################
+# Paychecks
+################################################################################################################################
+# Pay stub layout: start column of each table and the end column of its right aligned value columns (relative to start)
+PAYCHECK_WIDTH = 120
+EARNINGS_LAYOUT = (0, [('Hours', 29), ('Current', 42), ('YTD', 55)])
+TAXES_LAYOUT = (60, [('Current', 32), ('YTD', 46)])
+DEDUCTIONS_LAYOUT = [(begin, [('Current', 24), ('YTD', 36)]) for begin in (0, 40, 80)]
+
+def layout_row(tables=None):
+    """
+    Lay out one line of side by side tables. `tables` is a list of (layout, label, values) tuples, the label is left aligned at
+    the table start and each value is right aligned to end at its column.
+    """
+    row = [' '] * PAYCHECK_WIDTH
+    for (begin, columns), label, values in tables:
+        row[begin:begin + len(label)] = list(label)
+        for (_, end), value in zip(columns, values):
+            row[begin + end - len(value) + 1:begin + end + 1] = list(value)
+    return ''.join(row)
+
+# Paycheck taxes and deduction tables (before tax, after tax and other)
+PAYCHECK_TAXES = ['Federal Income Tax', 'Social Security', 'Medicare', 'State Income Tax']
+PAYCHECK_DEDUCTIONS = [['401k', 'Medical'], ['Roth'], ['Employer Match']]
+
+def paycheck_amounts(gross=4000.0, overtime=0.0):
+    """
+    Calculate the amounts of a pay stub from the regular `gross` pay and `overtime` pay, returns a dictionary keyed by the
+    items found by the default `pf.io.paycheck_parser()`. Works on scalars or arrays of paychecks.
+    """
+
+    amounts = {'Regular': gross * np.ones_like(overtime), 'Overtime': overtime}
+    total_gross = gross + overtime
+    amounts.update({
+        '401k': np.round(0.06 * total_gross, 2),
+        'Medical': 120.0 * np.ones_like(total_gross),
+        'Roth': np.round(0.02 * total_gross, 2),
+        'Employer Match': np.round(0.04 * total_gross, 2)
+    })
+    taxable = total_gross - amounts['401k'] - amounts['Medical']
+    amounts.update({
+        'Federal Income Tax': np.round(0.15 * taxable, 2),
+        'Social Security': np.round(0.062 * total_gross, 2),
+        'Medicare': np.round(0.0145 * total_gross, 2),
+        'State Income Tax': np.round(0.05 * taxable, 2)
+    })
+    total_tax = sum(amounts[name] for name in PAYCHECK_TAXES)
+    amounts.update({
+        'Base Rate': gross * np.ones_like(total_gross),
+        'Total Gross': total_gross,
+        'Fed Taxable Gross': taxable,
+        'OASDI Gross': total_gross,
+        'MEDI Gross': total_gross,
+        'Net Pay': taxable - amounts['Roth'] - total_tax,
+        'Total Pay': total_gross,
+        'Total Tax': total_tax,
+        'Total Before Tax': amounts['401k'] + amounts['Medical'],
+        'Total After Tax': amounts['Roth'],
+        'Total Other Tax': amounts['Employer Match']
+    })
+
+    return amounts
+
+def generate_paycheck_text(date='2016-01-15', gross=4000.0, seed=None):
+    """
+    Generate the text of a single pay stub in the layout parsed by the default `pf.io.paycheck_parser()`: a check date line,
+    base rate, a `Total Gross` summary, side by side `Earnings` and `Taxes` tables and three side by side deduction tables.
+    """
+
+    random = np.random.RandomState(seed)
+    date = pd.Timestamp(date)
+    fmt = '{:0,.2f}'.format
+    ytd = 2.0 * date.month
+
+    # Earnings, deductions (before tax, after tax and other) and taxes
+    amounts = paycheck_amounts(gross, np.round(0.1 * gross * random.rand(), 2))
+    total_gross, taxable, net = amounts['Total Gross'], amounts['Fed Taxable Gross'], amounts['Net Pay']
+    overtime = amounts['Overtime']
+    earnings = [('Regular', 80.0, amounts['Regular']), ('Overtime', np.round(overtime / 60.0, 2), overtime)]
+    deductions = [[(name, amounts[name]) for name in table] for table in PAYCHECK_DEDUCTIONS]
+    taxes = [(name, amounts[name]) for name in PAYCHECK_TAXES]
+    total_tax = amounts['Total Tax']
+
+    # Summary
+    lines = [
+        'Example Employer Inc.    Check Date: {0}    Period Ending: {0}'.format(date.strftime('%m/%d/%Y')),
+        'Hourly Base Rate:',
+        '    {}'.format(fmt(gross / 80.0)),
+        'Total Gross    Fed Taxable Gross    OASDI Gross    MEDI Gross    Net Pay',
+        'Current    {}'.format('    '.join(fmt(x) for x in [total_gross, taxable, total_gross, total_gross, net]))
+    ]
+
+    # Earnings and taxes tables
+    lines.append(layout_row([
+        (EARNINGS_LAYOUT, 'Earnings', [name for name, _ in EARNINGS_LAYOUT[1]]),
+        (TAXES_LAYOUT, 'Taxes', [name for name, _ in TAXES_LAYOUT[1]])
+    ]))
+    for i in range(max(len(earnings), len(taxes))):
+        tables = []
+        if i < len(earnings):
+            name, hours, current = earnings[i]
+            tables.append((EARNINGS_LAYOUT, name, [fmt(hours), fmt(current), fmt(ytd * current)]))
+        if i < len(taxes):
+            name, current = taxes[i]
+            tables.append((TAXES_LAYOUT, name, [fmt(current), fmt(ytd * current)]))
+        lines.append(layout_row(tables))
+    lines.append(layout_row([
+        (EARNINGS_LAYOUT, 'Total:', ['', fmt(total_gross), fmt(ytd * total_gross)]),
+        (TAXES_LAYOUT, 'Total:', [fmt(total_tax), fmt(ytd * total_tax)])
+    ]))
+
+    # Deduction tables
+    lines.append(layout_row([(layout, 'Description', [name for name, _ in layout[1]]) for layout in DEDUCTIONS_LAYOUT]))
+    for i in range(max(len(table) for table in deductions)):
+        lines.append(layout_row([
+            (layout, table[i][0], [fmt(table[i][1]), fmt(ytd * table[i][1])])
+            for layout, table in zip(DEDUCTIONS_LAYOUT, deductions) if i < len(table)
+        ]))
+    totals = [sum(amount for _, amount in table) for table in deductions]
+    lines.append(layout_row([
+        (layout, 'Total:', [fmt(total), fmt(ytd * total)]) for layout, total in zip(DEDUCTIONS_LAYOUT, totals)
+    ]))
+
+    return '\n'.join(lines) + '\n'
+
+def generate_paycheck_texts(start='2014-01-01', end='2016-12-31', gross=4000.0, seed=None):
+    """
+    Generate biweekly pay stub texts, returns a dictionary of date strings and paycheck text in the form passed to the paycheck
+    parser by `pf.io.read_in_paychecks()`.
+    """
+    random = np.random.RandomState(seed)
+    dates = pd.date_range(start, end, freq='2W-FRI')
+    return {
+        str(date.date()): generate_paycheck_text(date, gross=gross, seed=random.randint(2 ** 31 - 1))
+        for date in dates
+    }
+
+################################################################################################################################
+# Scale Data
+################################################################################################################################
+def stream_random(seed=None, stream='users'):
+    """Random state of one independent `stream` of data (see `SEED_STREAMS`) derived from a base `seed`"""
+    return np.random.RandomState(None if seed is None else [seed, SEED_STREAMS[stream]])
+
+def user_scales(number_of_users=1000, seed=None):
+    """
+    Income and spending level of each user relative to the population average, lognormal with mean 1.0. Every generator given
+    the same `seed` uses the same levels, so users with high income also have high spending and large balances.
+    """
+    return stream_random(seed, 'users').lognormal(-0.5 * USER_SIGMA ** 2, USER_SIGMA, number_of_users)
+
+def user_chunks(number_of_users=1000, rows_per_user=1, chunksize=1000000):
+    """Split users into arrays of consecutive user numbers with about `chunksize` rows each"""
+    users_per_chunk = max(1, int(chunksize // max(rows_per_user, 1)))
+    for first in range(0, number_of_users, users_per_chunk):
+        yield np.arange(first, min(first + users_per_chunk, number_of_users))
+
+def fred_priors(filepath='', start='2014-01-01', end='2016-12-31', cache=True):
+    """
+    Read the monthly per capita amount of each `FRED_PRIORS` category from the FRED data file (see `pf.io.read_in_fred()`),
+    returns a DataFrame with a monthly PeriodIndex from `start` to `end` and the transaction categories as columns.
+
+    FRED values are seasonally adjusted annual rates so they are divided by 12. Months beyond the FRED data use the nearest
+    available month.
+    """
+
+    columns = sorted({(column, 0) for column in FRED_PRIORS.values()})
+    fred = read_in_fred(filepath, columns=columns, cache=cache)
+    priors = pd.DataFrame(
+        {category: fred[(column, 0)].values.astype(np.float64) / 12.0 for category, column in FRED_PRIORS.items()},
+        index=fred.index.to_period('M')
+    )
+    months = pd.period_range(start, end, freq='M')
+
+    return priors.reindex(priors.index.union(months)).ffill().bfill().reindex(months)
+
+def iter_transactions(
+        number_of_users=1000,
+        start='2014-01-01',
+        end='2016-12-31',
+        transactions_per_month=60,
+        priors=None,
+        chunksize=1000000,
+        seed=None
+    ):
+    """
+    Generate Mint style transactions of many users, yields DataFrames of about `chunksize` rows in the raw Mint `csv` export
+    layout (see `generate_transactions()`) with an extra `Member` column. Each user's transactions are sorted newest first.
+
+    Amounts are lognormal, with the spread of `TRANSACTION_CATEGORIES` and scaled by each user's level (see `user_scales()`).
+    If monthly `priors` are given (see `fred_priors()`) each category's monthly total follows its prior, otherwise amounts keep
+    their constant means.
+    """
+
+    random = stream_random(seed, 'transactions')
+    scales = user_scales(number_of_users, seed)
+
+    # Date range
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    days = (end - start).days + 1
+    months = pd.period_range(start, end, freq='M')
+    rows_per_user = int(transactions_per_month * len(months))
+
+    # Mean amount of each (month, category), a category prior is spread over its expected number of monthly transactions
+    categories, _, means, stds, freqs = zip(*TRANSACTION_CATEGORIES)
+    freqs = np.array(freqs) / np.sum(freqs)
+    mean_table = np.tile(np.array(means), (len(months), 1))
+    if priors is not None:
+        priors = priors.reindex(months)
+        for j, category in enumerate(categories):
+            if category in priors:
+                mean_table[:, j] = priors[category].values / (transactions_per_month * freqs[j])
+
+    # Lognormal log standard deviation matching each category's coefficient of variation
+    sigma = np.sqrt(np.log(1.0 + (np.array(stds) / np.array(means)) ** 2))
+
+    for users in user_chunks(number_of_users, rows_per_user, chunksize):
+
+        # Number of transactions of each user and their dates, newest first within each user
+        counts = random.poisson(rows_per_user, len(users))
+        members = np.repeat(users, counts)
+        day = random.randint(0, days, counts.sum())
+        order = np.lexsort((-day, members))
+        day = day[order]
+        dates = pd.DatetimeIndex(start + pd.to_timedelta(day, unit='D'), name='Date')
+        month = 12 * (dates.year - start.year) + dates.month - start.month
+
+        # Categories and amounts, always at least a penny
+        picks = random.choice(len(categories), size=len(day), p=freqs)
+        mean = mean_table[month, picks] * scales[members]
+        amounts = mean * np.exp(sigma[picks] * random.randn(len(day)) - 0.5 * sigma[picks] ** 2)
+        amounts = np.maximum(amounts, 0.01).round(2)
+
+        columns = transaction_columns(random, picks, amounts)
+        columns['Member'] = members
+        yield pd.DataFrame(columns, index=dates)[['Member'] + RAW_TRANSACTION_COLUMNS]
+
+def iter_accounts(number_of_users=1000, start='2014-01-31', end='2016-12-31', chunksize=1000000, seed=None):
+    """
+    Generate monthly account balances of many users as random walks (see `generate_accounts()`), yields DataFrames of about
+    `chunksize` rows in the long layout of `pf.group.stack_accounts()`: `Member`, `Date`, `Type`, `Account` and `Balance`.
+    Initial balances are scaled by each user's level (see `user_scales()`).
+    """
+
+    random = stream_random(seed, 'accounts')
+    scales = user_scales(number_of_users, seed)
+    index = pd.date_range(start, end, freq='M')
+    types, names, initial, mean, std = [np.array(x) for x in zip(*ACCOUNTS)]
+
+    for users in user_chunks(number_of_users, len(index) * len(ACCOUNTS), chunksize):
+
+        # Random walk of every (user, month, account) at once
+        log_change = mean + std * random.randn(len(users), len(index), len(ACCOUNTS))
+        log_change[:, 0] = 0.0
+        balances = (scales[users, None, None] * initial * np.exp(np.cumsum(log_change, axis=1))).round(2)
+
+        # Long layout, users then dates then accounts
+        yield pd.DataFrame({
+            'Member': np.repeat(users, len(index) * len(ACCOUNTS)),
+            'Date': np.tile(np.repeat(index.values, len(ACCOUNTS)), len(users)),
+            'Type': pd.Categorical(np.tile(types, len(users) * len(index)), categories=sorted(set(types))),
+            'Account': pd.Categorical(np.tile(names, len(users) * len(index)), categories=sorted(set(names))),
+            'Balance': balances.ravel()
+        }, columns=['Member', 'Date', 'Type', 'Account', 'Balance'])
+
+def iter_paychecks(number_of_users=1000, start='2014-01-01', end='2016-12-31', priors=None, chunksize=1000000, seed=None):
+    """
+    Generate biweekly paychecks of many users, yields DataFrames of about `chunksize` rows in the layout returned by
+    `pf.io.read_in_paychecks()` with an extra `Member` column.
+
+    Regular gross pay is the monthly `Paycheck` prior (see `fred_priors()`), or $4,000 a paycheck without priors, scaled by each
+    user's level (see `user_scales()`).
+    """
+
+    random = stream_random(seed, 'paychecks')
+    scales = user_scales(number_of_users, seed)
+    index = pd.DatetimeIndex(pd.date_range(start, end, freq='2W-FRI'), name='Date')
+
+    # Population gross pay of each check date
+    if priors is not None:
+        monthly = priors['Paycheck'].reindex(index.to_period('M')).values
+        gross = (12.0 / 26.0) * monthly
+    else:
+        gross = 4000.0 * np.ones(len(index))
+
+    for users in user_chunks(number_of_users, len(index), chunksize):
+        user_gross = np.round(scales[users, None] * gross, 2).ravel()
+        overtime = np.round(0.1 * user_gross * random.rand(len(user_gross)), 2)
+        paychecks = pd.DataFrame(
+            paycheck_amounts(user_gross, overtime),
+            index=pd.DatetimeIndex(np.tile(index.values, len(users)), name='Date')
+        )
+        paychecks.insert(0, 'Member', np.repeat(users, len(index)))
+        yield paychecks
+
+def stream_to_file(chunks=None, filepath='', fileformat=None):
+    """
+    Write DataFrame `chunks` to a single `csv` or `parquet` file, one chunk in memory at a time, returns the number of rows
+    written. The format is taken from the file extension unless `fileformat` is given. Parquet requires `pyarrow`.
+    """
+
+    fileformat = fileformat if fileformat else os.path.splitext(filepath)[1].lstrip('.')
+    rows = 0
+
+    if fileformat == 'parquet':
+        import pyarrow
+        import pyarrow.parquet
+
+        writer = None
+        for chunk in chunks:
+            table = pyarrow.Table.from_pandas(chunk)
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(filepath, table.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+        if writer is not None:
+            writer.close()
+
+    else:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(filepath, mode='w' if i == 0 else 'a', header=i == 0)
+            rows += len(chunk)
+
+    return rows
+
+def generate_dataset(
+        directory='',
+        number_of_users=1000,
+        number_of_years=3,
+        end='2016-12-31',
+        fred_filepath=None,
+        fileformat='csv',
+        chunksize=1000000,
+        seed=None
+    ):
+    """
+    Generate transactions, accounts and paychecks of `number_of_users` users over `number_of_years` years ending at `end` and
+    stream them to `transactions`, `accounts` and `paychecks` files in `directory`, so datasets far larger than memory (e.g.
+    100 million transactions) can be written. Returns a dictionary of each file path and its number of rows.
+
+    If `fred_filepath` is given, FRED per capita averages are used as spending and income priors (see `fred_priors()`). The
+    category dictionaries of the dataset are those of `generate_categories()`.
+
+    Example:
+    ```
+    generate_dataset('/path/to/data', number_of_users=100000, number_of_years=15, fileformat='parquet', seed=0)
+    ```
+    """
+
+    # Fix the seed so all files share the same users
+    seed = seed if seed is not None else np.random.randint(2 ** 31 - 1)
+
+    end = pd.Timestamp(end)
+    start = end - pd.DateOffset(years=number_of_years) + pd.DateOffset(days=1)
+    priors = fred_priors(fred_filepath, start, end) if fred_filepath else None
+
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    datasets = [
+        ('transactions', iter_transactions(number_of_users, start, end, priors=priors, chunksize=chunksize, seed=seed)),
+        ('accounts', iter_accounts(number_of_users, start, end, chunksize=chunksize, seed=seed)),
+        ('paychecks', iter_paychecks(number_of_users, start, end, priors=priors, chunksize=chunksize, seed=seed))
+    ]
+    written = {}
+    for name, chunks in datasets:
+        filepath = os.path.join(directory, '{}.{}'.format(name, fileformat))
+        written[filepath] = stream_to_file(chunks, filepath, fileformat)
+
+    return written
@@ -20,30 +20,140 @@ credits    :
 from __future__ import division
 
 import sys
+import time
 import hashlib
+import inspect
 import datetime
+import multiprocessing
 import warnings
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 import scipy.stats as st
 
-from pf.constants import DAYS_IN_YEAR
+from pf.constants import DAYS_IN_YEAR, PROGRESS_INTERVAL, F2AS_CACHE_SIZE, F2AS_MAX_CENTS, QUANTILE_SKETCH_SIZE
+from pf.constants import INVERSE_CDF_TABLE_SIZE, INVERSE_CDF_TABLE_CACHE_SIZE, INVERSE_CDF_NUMERICAL_PPF_COST
 
 ################################################################################################################################
 # General Helper/Conversion Functions
 ################################################################################################################################
 
-def get_age(date=datetime.datetime.now(), bday=datetime.datetime(1989, 3, 27)):
-    """Calculate personal age given birthday"""
+def lru_get(cache=None, key=None, build=None, max_size=64):
+    """
+    Get `key` from an OrderedDict `cache` of least recently used first values, calling `build()` to make it if missing. The
+    least recently used values are evicted once there are more than `max_size`.
+    """
+
+    # Move value to most recently used or build it
+    value = cache.pop(key, None)
+    if value is None:
+        value = build()
+    cache[key] = value
+
+    # Evict least recently used values
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+
+    return value
+
+def get_age(date=None, bday=datetime.datetime(1989, 3, 27)):
+    """Calculate personal age given birthday, at `date` or now"""
+    date = date if date is not None else datetime.datetime.now()
     return np.round((date - bday).days / DAYS_IN_YEAR, 2)
 
-def f2as(x=0.0):
-    """Format number to accounting string"""
+def year_fractions(dates=None, asof=None):
+    """
+    Calculate years from the `asof` timestamp (now by default) to each of `dates` (a DatetimeIndex or array of dates) at once,
+    returns an array that is negative for dates before `asof` and NaN for missing dates. Pass one `asof` to every call of a
+    computation so all its dates are measured from the same moment.
+    """
+    asof = pd.Timestamp(asof if asof is not None else datetime.datetime.now())
+    days = (pd.DatetimeIndex(dates) - asof).days
+    return np.asarray(days, dtype=np.float64) / DAYS_IN_YEAR
+
+def get_ages(dates=None, bday=datetime.datetime(1989, 3, 27)):
+    """Calculate personal age at each of `dates` given birthday, returns an array (see `get_age()`)"""
+    return np.round(year_fractions(dates, bday), 2)
+
+def f2as(x=0.0, cents=False):
+    """
+    Format number to accounting string. Arrays, Series and DataFrames are formatted in bulk (see `f2as_array()`). If `cents` is
+    set, `x` is in integer cents.
+    """
+    if isinstance(x, (pd.Series, pd.DataFrame)) or np.ndim(x) > 0:
+        return f2as_array(x, cents=cents)
+    x = x / 100.0 if cents else x
     if np.isnan(x):
         return ' '
     else:
         return '{:0,.2f}'.format(x) if x >= 0 else '({:0,.2f})'.format(np.abs(x))
 
+# Accounting strings of integer cents already formatted
+F2AS_CACHE = {}
+
+def cents2as(cents=0):
+    """Format integer cents to accounting string, cached"""
+    string = F2AS_CACHE.get(cents)
+    if string is None:
+        if len(F2AS_CACHE) >= F2AS_CACHE_SIZE:
+            F2AS_CACHE.clear()
+        dollars, remainder = divmod(abs(cents), 100)
+        string = '{:0,d}.{:02d}'.format(dollars, remainder)
+        string = F2AS_CACHE[cents] = string if cents >= 0 else '({})'.format(string)
+    return string
+
+def f2as_array(values=None, cents=False):
+    """
+    Format an array, Series or DataFrame of numbers to accounting strings, returns the same type of strings. Numbers are
+    rounded to integer cents (or are integer cents if `cents` is set) and each distinct value is only formatted once, so
+    repeated values are nearly free. Only numeric columns of a DataFrame are formatted. Infinite values and values too large
+    for exact integer cents (`F2AS_MAX_CENTS`) are formatted one by one like `f2as()`, e.g. 'inf'.
+    """
+
+    # Format numeric DataFrame columns as one block
+    if isinstance(values, pd.DataFrame):
+        formatted = values.copy()
+        numeric = values.select_dtypes(include=[np.number]).columns
+        if len(numeric):
+            formatted[numeric] = f2as_array(values[numeric].values, cents=cents)
+        return formatted
+    if isinstance(values, pd.Series):
+        return pd.Series(f2as_array(values.values, cents=cents), index=values.index, name=values.name)
+
+    # Integer cents
+    values = np.asarray(values)
+    if cents and values.dtype.kind in 'iu':
+        missing = np.zeros(values.shape, dtype=bool)
+        large = np.zeros(values.shape, dtype=bool)
+        amounts = values.astype(np.int64)
+    else:
+        values = values.astype(np.float64)
+        missing = np.isnan(values)
+        scaled = np.where(missing, 0.0, values) * (1.0 if cents else 100.0)
+        large = ~(np.abs(scaled) < F2AS_MAX_CENTS)
+        scaled[large] = 0.0
+        amounts = np.round(scaled).astype(np.int64)
+
+        # Scaling can land on a tie that `format` rounds the other way, so ties are rounded by `format` itself
+        ties = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+        if not cents and ties.any():
+            amounts[ties] = [int(round(100.0 * float('{:0.2f}'.format(v)))) for v in values[ties]]
+
+    # Format distinct values only
+    distinct, inverse = np.unique(amounts, return_inverse=True)
+    strings = np.array([cents2as(c) for c in distinct.tolist()], dtype=object)
+    formatted = strings[inverse].reshape(amounts.shape)
+
+    # Negative amounts rounding to zero keep their parentheses, missing values are blank
+    if values.dtype.kind == 'f':
+        with np.errstate(invalid='ignore'):
+            formatted[(amounts == 0) & (values < 0.0)] = '(0.00)'
+    formatted[missing] = ' '
+    if large.any():
+        formatted[large] = [f2as(v, cents=cents) for v in values[large]]
+
+    return formatted
+
 def read_date_csv_file(filepath=''):
     """Convinience function for reading standard date index csv"""
     df = pd.read_csv(filepath, index_col=0, parse_dates=True)
@@ -57,48 +167,116 @@ def checksum(fname):
             hash_md5.update(chunk)
     return hash_md5.hexdigest()
 
+def checksum_frame(df):
+    """Calculate the MD5 hash of a DataFrame or Series (values, index and labels)"""
+    hash_md5 = hashlib.md5()
+    hash_md5.update(df.to_csv())
+    return hash_md5.hexdigest()
+
 ################################################################################################################################
 # Progress Bar for interactive sanety during long calcualtions
 ################################################################################################################################
 class ProgressBar(object):
-    """Implements a comand-line progress bar"""
+    """
+    Implements a throttled comand-line progress bar with throughput and ETA.
+
+    The bar is only redrawn every `interval` seconds, so updating it each iteration of a tight loop costs one clock read. By
+    default it is drawn when `stream` (stdout by default) is a terminal or in a Jupyter (IPython kernel) notebook, `enabled`
+    overrides this.
+
+    Work done in worker processes is counted with a shared `counter` (see `progress_counter()`), handed to workers as a
+    `Process` argument or `Pool` initializer argument, that workers increment with `progress_increment()` while the parent
+    process follows it with `watch()`.
 
-    def __init__(self, iterations):
+    Example:
+    ```
+    progress = ProgressBar(len(items))
+    for i, item in enumerate(items):
+        work(item)
+        progress.animate(i)
+    progress.close()
+    ```
+    """
+
+    def __init__(self, iterations, interval=PROGRESS_INTERVAL, counter=None, stream=None, enabled=None):
         """Create a progress bar"""
         self.iterations = iterations
-        self.prog_bar = '[]'
+        self.interval = interval
+        self.counter = counter
+        self.stream = stream if stream else sys.stdout
+        if enabled is None:
+            enabled = (hasattr(self.stream, 'isatty') and self.stream.isatty()) or 'ipykernel' in sys.modules
+        self.enabled = enabled
         self.fill_char = '*'
         self.width = 40
-        self.__update_amount(0)
-
+        self.count = 0
+        self.start = time.time()
+        self.next_draw = self.start + interval
 
     def animate(self, iterate):
-        """Animate progress"""
-        print '\r', self,
-        sys.stdout.flush()
-        self.update_iteration(iterate + 1)
-        return self
+        """Animate progress of the `iterate` (zero based) iteration"""
+        return self.update_iteration(iterate + 1)
 
     def update_iteration(self, elapsed_iter):
-        """Increment progress"""
-        self.__update_amount((elapsed_iter / float(self.iterations)) * 100.0)
-        self.prog_bar = '%s  %s of %s complete' % (self.prog_bar, elapsed_iter, self.iterations)
+        """Set the number of completed iterations, redrawing if the interval has passed"""
+        self.count = elapsed_iter
+        if self.enabled:
+            now = time.time()
+            if now >= self.next_draw:
+                self.next_draw = now + self.interval
+                self.draw(now)
         return self
 
-    def __update_amount(self, new_amount):
-        """Update amount of progress"""
-        percent_done = int(round((new_amount / 100.0) * 100.0))
-        all_full = self.width - 2
-        num_hashes = int(round((percent_done / 100.0) * all_full))
-        self.prog_bar = '[%s%s]' % ((self.fill_char * num_hashes), ' ' * (all_full - num_hashes))
-        pct_place = (len(self.prog_bar) // 2) - len(str(percent_done))
-        pct_string = '%s%%' % (percent_done)
-        self.prog_bar = '%s%s%s' % (self.prog_bar[0:pct_place], pct_string, self.prog_bar[pct_place + len(pct_string):])
-        return self
+    def watch(self, result=None):
+        """Follow the shared counter until the `multiprocessing` async `result` is ready, returns the result's value"""
+        while not result.ready():
+            result.wait(self.interval)
+            self.update_iteration(self.counter.value)
+        self.update_iteration(self.counter.value)
+        return result.get()
+
+    def draw(self, now=None):
+        """Write the progress bar"""
+        self.stream.write('\r{}'.format(self.render(now if now else time.time())))
+        self.stream.flush()
+
+    def render(self, now=None):
+        """Render the progress bar string with percent done, count, throughput and ETA"""
+        fraction = min(self.count / self.iterations, 1.0) if self.iterations else 1.0
+        elapsed = max(now - self.start, 1e-9)
+        rate = self.count / elapsed
+        eta = (self.iterations - self.count) / rate if rate else np.inf
+        num_hashes = int(round(fraction * (self.width - 2)))
+        return '[{}{}] {:3.0f}%  {} of {} complete  {:0,.1f}/s  ETA {}'.format(
+            self.fill_char * num_hashes,
+            ' ' * (self.width - 2 - num_hashes),
+            100.0 * fraction,
+            self.count,
+            self.iterations,
+            rate,
+            '{:0.0f}s'.format(eta) if np.isfinite(eta) else '?'
+        )
+
+    def close(self):
+        """Draw the final state and end the line"""
+        if self.enabled:
+            self.draw()
+            self.stream.write('\n')
+            self.stream.flush()
 
     def __str__(self):
         """String representation"""
-        return str(self.prog_bar)
+        return self.render(time.time())
+
+def progress_counter():
+    """Create a counter shared with worker processes for `ProgressBar`"""
+    return multiprocessing.Value('l', 0)
+
+def progress_increment(counter=None, n=1):
+    """Add `n` completed iterations to a shared progress `counter` from a worker process, no-op without a counter"""
+    if counter is not None:
+        with counter.get_lock():
+            counter.value += n
 
 ################################################################################################################################
 # Stats Helper Functions
@@ -123,8 +301,11 @@ def make_pdf(dist, params, size=10000):
     return pdf
 
 # Create models from data
-def best_fit_distribution(data, bins=200):
-    """Model data by finding best fit distribution to data"""
+def best_fit_distribution(data, bins=200, progress=False):
+    """
+    Model data by finding best fit distribution to data. A `ProgressBar` of the distributions tried is shown if `progress` is
+    set, leave it off when fitting inside a loop that has its own progress bar.
+    """
     # Get histogram of original data
     y, x = np.histogram(data, bins=bins, normed=True)
     x = (x + np.roll(x, -1))[:-1] / 2.0
@@ -149,7 +330,9 @@ def best_fit_distribution(data, bins=200):
     best_sse = np.inf
 
     # Estimate distribution parameters from data
-    for distribution in distributions:
+    progress = ProgressBar(len(distributions), enabled=None if progress else False)
+    for i, distribution in enumerate(distributions):
+        progress.animate(i)
         # Try to fit the distribution
         try:
             # Ignore warnings from data that can't be fit
@@ -176,4 +359,318 @@ def best_fit_distribution(data, bins=200):
         except Exception:
             pass
 
+    progress.close()
+
     return (best_distribution.name, best_params)
+
+################################################################################################################################
+# Distribution Samplers
+################################################################################################################################
+class InverseCDFTable(object):
+    """
+    Fast sampler of a fit distribution (see `best_fit_distribution()`) by a lookup table of its inverse CDF (`ppf`).
+
+    The `ppf` is evaluated once on `size + 1` evenly spaced probabilities (the end points at `0.5 / size` and `1 - 0.5 / size`,
+    so unbounded tails stay finite) and samples are uniform draws linearly interpolated in the table, in constant time per
+    sample however slow the distribution's own `rvs` is. The table is exact at its grid points and monotonic in between, so the
+    CDF of the samples is within `1 / size` of the true CDF everywhere (Kolmogorov-Smirnov distance <= `1 / size`), far below
+    the sampling error of any practical number of Monte Carlo runs.
+    """
+
+    def __init__(self, model_name='norm', params=(0.0, 1.0), size=INVERSE_CDF_TABLE_SIZE):
+        """Build the inverse CDF table of distribution `model_name` with `params`"""
+        self.model_name = model_name
+        self.params = tuple(params)
+        self.size = size
+
+        # Probability grid, end points pulled in from 0 and 1
+        u = np.linspace(0.0, 1.0, size + 1)
+        u[0], u[-1] = 0.5 / size, 1.0 - 0.5 / size
+
+        # Quantiles, repairing points `ppf` could not evaluate and keeping the table monotonic
+        with np.errstate(all='ignore'), warnings.catch_warnings():
+            warnings.filterwarnings('ignore')
+            table = getattr(st, model_name).ppf(u, *self.params)
+        finite = np.isfinite(table)
+        table = np.interp(u, u[finite], table[finite]) if finite.any() else np.zeros(size + 1)
+        self.table = np.maximum.accumulate(table)
+
+    def ppf(self, u=None):
+        """Quantiles of probabilities `u` (0 to 1) by linear interpolation in the table"""
+        position = np.asarray(u, dtype=np.float64) * self.size
+        index = np.clip(position.astype(np.int64), 0, self.size - 1)
+        fraction = np.clip(position - index, 0.0, 1.0)
+        return self.table[index] + fraction * (self.table[index + 1] - self.table[index])
+
+    def sample(self, size=1, random=None):
+        """Draw `size` (an int or shape) samples with `random` state (numpy's global state by default)"""
+        random = random if random else np.random
+        return self.ppf(random.random_sample(size))
+
+class ExactSampler(object):
+    """Sampler of a fit distribution with its own scipy `rvs` and `ppf`, same interface as `InverseCDFTable`"""
+
+    def __init__(self, model_name='norm', params=(0.0, 1.0)):
+        """Sampler of distribution `model_name` with `params`"""
+        self.model_name = model_name
+        self.params = tuple(params)
+        self.distribution = getattr(st, model_name)
+
+    def ppf(self, u=None):
+        """Quantiles of probabilities `u` (0 to 1)"""
+        return self.distribution.ppf(u, *self.params)
+
+    def sample(self, size=1, random=None):
+        """Draw `size` (an int or shape) samples with `random` state (numpy's global state by default)"""
+        return self.distribution.rvs(*self.params, size=size, random_state=random)
+
+# Inverse CDF tables of fit distributions, least recently used first
+INVERSE_CDF_TABLES = OrderedDict()
+
+def inverse_cdf_table(model_name='norm', params=(0.0, 1.0), size=INVERSE_CDF_TABLE_SIZE):
+    """
+    Get a memoized InverseCDFTable of a fit distribution, so each fit model builds its table once. The least recently used
+    tables are evicted once there are more than INVERSE_CDF_TABLE_CACHE_SIZE tables.
+    """
+    return lru_get(
+        INVERSE_CDF_TABLES,
+        (model_name, tuple(params), size),
+        lambda: InverseCDFTable(model_name, params, size),
+        INVERSE_CDF_TABLE_CACHE_SIZE
+    )
+
+def defines_method(distribution=None, method='_ppf'):
+    """Whether a scipy `distribution` defines its own `method`, rather than the generic numerical one of `rv_continuous`"""
+    return any(
+        method in vars(cls)
+        for cls in inspect.getmro(type(distribution))
+        if cls.__module__ != st.rv_continuous.__module__ and cls is not object
+    )
+
+def tabulate_cheaper(model_name='norm', draws=None, size=INVERSE_CDF_TABLE_SIZE, by_ppf=False):
+    """
+    Whether building an InverseCDFTable of `size` costs less than drawing `draws` exact samples of distribution `model_name`
+    (through `ppf` if `by_ppf`, as copulas do, through `rvs` otherwise). An unknown number of `draws` is taken as many.
+
+    The costs are counted from the distribution's scipy definition, not timed, so the choice is the same on every machine and
+    run. A table costs `size + 1` evaluations of `ppf`. A `ppf` without a closed form is a numerical inversion of the CDF that
+    costs `INVERSE_CDF_NUMERICAL_PPF_COST` closed form evaluations, and an `rvs` without its own method inverts that `ppf`.
+    """
+    if draws is None:
+        return True
+    distribution = getattr(st, model_name)
+    ppf_cost = 1.0 if defines_method(distribution, '_ppf') else INVERSE_CDF_NUMERICAL_PPF_COST
+    draw_cost = 1.0 if defines_method(distribution, '_rvs') and not by_ppf else ppf_cost
+    return (size + 1) * ppf_cost < draws * draw_cost
+
+def model_sampler(model_name='norm', params=(0.0, 1.0), table=True, draws=None, by_ppf=False):
+    """
+    Sampler of a fit distribution model (name, params) for `draws` samples. With `table` it is a cached `InverseCDFTable` when
+    that is cheaper than exact sampling (see `tabulate_cheaper()`), otherwise an `ExactSampler`. So a few hundred thousand
+    draws of a slow distribution (e.g. `gausshyper`) are tabulated in seconds instead of inverted one by one, while
+    `levy_stable`, which has its own fast `rvs` but a very slow `ppf`, is drawn exactly.
+    """
+    if table and tabulate_cheaper(model_name, draws, by_ppf=by_ppf):
+        return inverse_cdf_table(model_name, params)
+    return ExactSampler(model_name, params)
+
+################################################################################################################################
+# Streaming Statistics
+################################################################################################################################
+class QuantileSketch(object):
+    """
+    Mergeable quantile sketch of every cell of an array `shape`, updated with chunks of rows of shape (n,) + `shape`.
+
+    Values are kept exactly until a cell holds more than `size` of them, then they are compressed into `size / 2` weighted
+    centroids (merging t-digest with the arcsine scale function), which are finest in the tails. Quantiles are linearly
+    interpolated between centroid ranks, matching `numpy.percentile` exactly while uncompressed and within a rank error of
+    about `pi / size` at the median (less in the tails) after. NaNs and Infs are ignored.
+
+    Example:
+    ```
+    sketch = QuantileSketch(shape=(3,))
+    for chunk in chunks:
+        sketch.update(chunk)
+    sketch.merge(other_sketch).quantile([0.05, 0.5, 0.95])
+    ```
+    """
+
+    def __init__(self, shape=(), size=QUANTILE_SKETCH_SIZE):
+        """Empty sketch of each cell"""
+        self.shape = tuple(shape)
+        self.size = size
+        cells = int(np.prod(self.shape))
+        self.means = np.empty((cells, 0))
+        self.weights = np.empty((cells, 0))
+        self.count = np.zeros(cells)
+        self.min = np.full(cells, np.inf)
+        self.max = np.full(cells, -np.inf)
+
+    def update(self, values=None):
+        """Add rows of `values`, returns the sketch"""
+        values = np.asarray(values, dtype=np.float64).reshape((-1, len(self.count))).T
+        finite = np.isfinite(values)
+        if finite.any():
+            self.add(np.where(finite, values, np.nan), finite.astype(np.float64))
+            self.min = np.minimum(self.min, np.where(finite, values, np.inf).min(axis=1))
+            self.max = np.maximum(self.max, np.where(finite, values, -np.inf).max(axis=1))
+        return self
+
+    def merge(self, other=None):
+        """Merge the centroids of `other` sketch of the same shape, returns the sketch"""
+        self.add(other.means, other.weights)
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    def add(self, means=None, weights=None):
+        """Append (cells x n) centroids, compressing once cells hold more than `size`"""
+        self.means = np.concatenate([self.means, means], axis=1)
+        self.weights = np.concatenate([self.weights, weights], axis=1)
+        self.count = self.count + weights.sum(axis=1)
+        if self.means.shape[1] > self.size:
+            self.compress()
+
+    def compress(self):
+        """Merge neighboring centroids of each cell into `size / 2` buckets of the arcsine scale"""
+        cells, buckets = len(self.count), max(1, self.size // 2)
+
+        # Sort centroids of each cell, empty ones (NaN) last
+        order = np.argsort(self.means, axis=1)
+        means = np.take_along_axis(self.means, order, axis=1)
+        weights = np.take_along_axis(self.weights, order, axis=1)
+
+        # Bucket of each centroid's mid rank, buckets are narrow near the extremes
+        total = np.where(self.count > 0.0, self.count, 1.0)[:, None]
+        q = (np.cumsum(weights, axis=1) - 0.5 * weights) / total
+        bucket = np.floor(buckets * (np.arcsin(np.clip(2.0 * q - 1.0, -1.0, 1.0)) / np.pi + 0.5)).astype(np.int64)
+        bucket = np.minimum(bucket, buckets - 1) + buckets * np.arange(cells)[:, None]
+
+        # Weighted mean of each bucket, empty buckets have zero weight
+        weight_sums = np.bincount(bucket.ravel(), weights.ravel(), minlength=cells * buckets)
+        weighted = np.where(weights > 0.0, means * weights, 0.0)
+        value_sums = np.bincount(bucket.ravel(), weighted.ravel(), minlength=cells * buckets)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.means = np.where(weight_sums > 0.0, value_sums / weight_sums, np.nan).reshape((cells, buckets))
+        self.weights = weight_sums.reshape((cells, buckets))
+
+    def quantile(self, q=0.5):
+        """Quantiles `q` (0 to 1) of each cell, returns an array of shape `q.shape + shape` (NaN for empty cells)"""
+        q = np.asarray(q, dtype=np.float64)
+        result = np.full((len(self.count),) + q.shape, np.nan)
+        for cell in np.flatnonzero(self.count):
+            filled = self.weights[cell] > 0.0
+            means, weights = self.means[cell, filled], self.weights[cell, filled]
+            order = np.argsort(means)
+            means, weights = means[order], weights[order]
+
+            # Rank of each centroid's center, bounded by the exact extremes
+            ranks = np.cumsum(weights) - 0.5 * (weights + 1.0)
+            last = self.count[cell] - 1.0
+            ranks = np.concatenate([[0.0], ranks, [last]])
+            means = np.concatenate([[self.min[cell]], means, [self.max[cell]]])
+            result[cell] = np.interp(q * last, ranks, means)
+        return np.moveaxis(result, 0, -1).reshape(q.shape + self.shape)
+
+class StatsAccumulator(object):
+    """
+    Single pass statistics (Current, Max, Min, Mean, Median, Std Dev and quantiles) of each column of DataFrames.
+
+    Rows are added in chunks with `update()`, and accumulators of different members or partitions are combined with `merge()`,
+    so statistics of long or pooled histories never need all rows at once. Mean and variance are combined with the parallel
+    algorithm of Chan et al., Median and quantiles come from a `QuantileSketch` (exact up to `size` rows). Current is the row
+    with the latest index. Infs and NaNs count as 0.0.
+
+    Example:
+    ```
+    stats = StatsAccumulator()
+    for chunk in net_worth_chunks:
+        stats.update(chunk)
+    stats.merge(other_stats).stats(quantiles=[0.05, 0.95])
+    ```
+    """
+
+    def __init__(self, columns=None, size=QUANTILE_SKETCH_SIZE):
+        """Empty accumulator of `columns`, taken from the first update if not given"""
+        self.columns = None
+        self.size = size
+        if columns is not None:
+            self.reset(columns)
+
+    def reset(self, columns=None):
+        """Clear statistics of `columns`"""
+        self.columns = pd.Index(columns)
+        self.count = 0
+        self.mean = np.zeros(len(self.columns))
+        self.m2 = np.zeros(len(self.columns))
+        self.min = np.full(len(self.columns), np.inf)
+        self.max = np.full(len(self.columns), -np.inf)
+        self.current = np.full(len(self.columns), np.nan)
+        self.last = None
+        self.sketch = QuantileSketch((len(self.columns),), self.size)
+
+    def combine(self, count=0, mean=None, m2=None):
+        """Combine the mean and sum of squared deviations of `count` more rows"""
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    def update(self, frame=None):
+        """Add the rows of `frame`, returns the accumulator"""
+        if self.columns is None:
+            self.reset(frame.columns)
+        if len(frame) == 0:
+            return self
+
+        values = frame[self.columns].values.astype(np.float64)
+        values[~np.isfinite(values)] = 0.0
+
+        mean = values.mean(axis=0)
+        self.combine(len(values), mean, ((values - mean) ** 2).sum(axis=0))
+        self.min = np.minimum(self.min, values.min(axis=0))
+        self.max = np.maximum(self.max, values.max(axis=0))
+        if self.last is None or frame.index[-1] >= self.last:
+            self.current, self.last = values[-1], frame.index[-1]
+        self.sketch.update(values)
+
+        return self
+
+    def merge(self, other=None):
+        """Merge the statistics of `other` accumulator of the same columns, returns the accumulator"""
+        if self.columns is None:
+            self.reset(other.columns)
+        if other.count == 0:
+            return self
+
+        self.combine(other.count, other.mean, other.m2)
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        if self.last is None or other.last >= self.last:
+            self.current, self.last = other.current, other.last
+        self.sketch.merge(other.sketch)
+
+        return self
+
+    def quantile(self, q=0.5):
+        """Quantiles `q` (0 to 1) of each column, returns a Series (or DataFrame indexed by `q` for a list)"""
+        values = self.sketch.quantile(q)
+        if np.ndim(q):
+            return pd.DataFrame(values, index=q, columns=self.columns)
+        return pd.Series(values, index=self.columns)
+
+    def stats(self, quantiles=None):
+        """Statistics of each column as a DataFrame, with additional columns for `quantiles` (0 to 1) if given"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(self.m2 / (self.count - 1))
+        stats = pd.DataFrame({'Current': self.current}, index=self.columns)
+        stats['Max'] = self.max
+        stats['Min'] = self.min
+        stats['Mean'] = self.mean
+        stats['Median'] = self.sketch.quantile(0.5)
+        stats['Std Dev'] = std
+        if quantiles:
+            for q, values in zip(quantiles, self.sketch.quantile(quantiles)):
+                stats['{:g}%'.format(100.0 * q)] = values
+        return stats